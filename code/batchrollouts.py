@@ -0,0 +1,207 @@
+# Lockstep rollouts for a batch of boards held in one (B, size, size) int8 tensor (0 empty, 1 'P',
+# 2 'E'), for scoring an MCTS leaf by many rollouts at once or many leaves together. Every ply picks a
+# move on all unfinished boards, applies it and re-checks for wins with NumPy kernels; the batch only
+# loops over plies and over the rows of a flood.
+#
+# The policy is hard.MCTS._simulate's, with scores made of whole-board arrays:
+#   Passer: a winning cell, else the frontier cell below its deepest chain, else the bottom row.
+#   Eater: block a winning cell, else the cells near the Passer's last move; on overwrite turns a 'P'
+#   cell scores +100 when the Passer reaches it from the top and +50 otherwise.
+# Where the scalar rollout tries moves one by one, the batch approximates. It doesn't look for an
+# Eater move that wins at once, and it scores overwrites without the path-length change. Ties break
+# at random (uniform noise below 1, smaller than any score step, is added to every score), and with
+# probability epsilon a board plays any legal move, so rollouts from one position differ. Rewards
+# are the Eater's, as in _simulate: 1 for an Eater win, -1 for a Passer win, else
+# 1 / (path length + 1), or 0 without a chain.
+
+import numpy as np
+
+EMPTY, PASSER, EATER = 0, 1, 2
+CODES = {None: EMPTY, 'P': PASSER, 'E': EATER}
+UNREACHED = 1 << 16  # Distance of cells a flood doesn't reach
+RUN = 1 << 18  # Offset per run of allowed cells in a row, keeps minimum.accumulate inside a run
+
+
+def fill_row(seeds, allowed):
+    # Spreads the seed distances of a row (B, n) sideways along runs of allowed cells, one step per
+    # cell: rightwards on the row and leftwards on its mirror image, stacked into one pass
+    count, n = seeds.shape
+    cols = np.arange(n)
+    seeds = np.where(allowed, seeds, UNREACHED)
+    seeds = np.concatenate((seeds, seeds[:, ::-1]))
+    run = np.concatenate((~allowed, ~allowed[:, ::-1])).cumsum(axis=1) * RUN
+    spread = np.minimum.accumulate(seeds - cols - run, axis=1) + run + cols
+    best = np.minimum(spread[:count], spread[count:, ::-1])
+    return np.where(allowed & (best < UNREACHED), best, UNREACHED)
+
+
+def flood(allowed):
+    # Fewest Passer-rule steps from the top row to every allowed cell through allowed cells, one row
+    # at a time (moves only go down or sideways); UNREACHED elsewhere. allowed: (B, n, n) bool
+    dist = np.full(allowed.shape, UNREACHED, np.int32)
+    seeds = np.where(allowed[:, 0], 0, UNREACHED)
+    for i in range(allowed.shape[1]):
+        if i:
+            above = dist[:, i - 1]
+            if (above >= UNREACHED).all():  # Nothing reached the row above, so nothing gets further down
+                break
+            seeds = above.copy()
+            np.minimum(seeds[:, 1:], above[:, :-1], out=seeds[:, 1:])  # Down-right from j - 1
+            np.minimum(seeds[:, :-1], above[:, 1:], out=seeds[:, :-1])  # Down-left from j + 1
+            seeds += 1
+        dist[:, i] = fill_row(seeds, allowed[:, i])
+    return dist
+
+
+def steps_into(cells):
+    # Cells one Passer move away from any of `cells`
+    into = np.zeros_like(cells)
+    into[:, 1:] |= cells[:, :-1]
+    into[:, 1:, 1:] |= cells[:, :-1, :-1]
+    into[:, 1:, :-1] |= cells[:, :-1, 1:]
+    into[:, :, 1:] |= cells[:, :, :-1]
+    into[:, :, :-1] |= cells[:, :, 1:]
+    return into
+
+
+def steps_out_of(cells):
+    # Cells with a Passer move into any of `cells`
+    out = np.zeros_like(cells)
+    out[:, :-1] |= cells[:, 1:]
+    out[:, :-1, :-1] |= cells[:, 1:, 1:]
+    out[:, :-1, 1:] |= cells[:, 1:, :-1]
+    out[:, :, 1:] |= cells[:, :, :-1]
+    out[:, :, :-1] |= cells[:, :, 1:]
+    return out
+
+
+def passer_threats(boards, reach):
+    # Empty cells where one more 'P' joins the top row to the bottom row: entered from the top row
+    # or a reached 'P', and left to the bottom row or a 'P' that gets there
+    passer = boards == PASSER
+    back = flood(passer[:, ::-1])[:, ::-1] < UNREACHED  # 'P' cells with a 'P' route down to the bottom row
+    entered = steps_into(reach)
+    entered[:, 0] = True
+    left = steps_out_of(back)
+    left[:, -1] = True
+    return (boards == EMPTY) & entered & left
+
+
+def deepest(dist):
+    # Per board the deepest reached cell, the longest chain on ties like PasserChain: (row, col,
+    # steps from the top), row -1 when nothing is reached
+    reached = dist < UNREACHED
+    rows = reached.any(axis=2)
+    n = dist.shape[1]
+    row = n - 1 - np.argmax(rows[:, ::-1], axis=1)
+    steps = dist[np.arange(len(dist)), row]
+    steps = np.where(steps < UNREACHED, steps, -1)
+    col = np.argmax(steps, axis=1)
+    return np.where(rows.any(axis=1), row, -1), col, steps[np.arange(len(dist)), col]
+
+
+def eater_won(boards):
+    return ~(flood(boards != EATER)[:, -1] < UNREACHED).any(axis=1)
+
+
+class BatchRollouts:
+    def __init__(self, size, max_depth=8, epsilon=0.0, seed=None):
+        self.size = size
+        self.max_depth = max_depth
+        self.epsilon = epsilon
+        self.rng = np.random.default_rng(seed)
+        rows, cols = np.indices((size, size))
+        self.rows, self.cols = rows, cols
+
+    def encode(self, states, repeats=1):
+        # Tensor and per-board turn data for `repeats` copies of each state, copies of a state adjacent
+        codes = [[CODES[cell] for cell in row] for state in states for row in state.board]
+        boards = np.repeat(np.array(codes, np.int8).reshape(len(states), self.size, self.size), repeats, axis=0)
+        passer_turn = np.repeat([state.current_player == 'P' for state in states], repeats)
+        eater_turns = np.repeat([state.eater_turn_count for state in states], repeats)
+        last = np.repeat([state.get_passer_last_move() or (-self.size, -self.size) for state in states], repeats, axis=0)
+        return boards, passer_turn, eater_turns, last
+
+    def evaluate(self, states, rollouts=1):
+        # Mean reward of `rollouts` lockstep rollouts from each state
+        rewards = self.run(*self.encode(states, rollouts))
+        return rewards.reshape(len(states), rollouts).mean(axis=1)
+
+    def run(self, boards, passer_turn, eater_turns, last):
+        # Plays every board out in place, up to max_depth plies; returns the rewards
+        passer_won = (flood(boards == PASSER)[:, -1] < UNREACHED).any(axis=1)
+        done_eater = eater_won(boards)
+        alive = ~(passer_won | done_eater)
+        for _ in range(self.max_depth):
+            live = np.flatnonzero(alive)
+            if not len(live):
+                break
+            moves, scores, threats = self.choose(boards[live], passer_turn[live], eater_turns[live], last[live])
+            stuck = np.isneginf(scores)  # No legal move
+            alive[live[stuck]] = False
+            moving = ~stuck
+            live, moves, threats = live[moving], moves[moving], threats[moving]
+            passer = passer_turn[live]
+            i, j = moves // self.size, moves % self.size
+            boards[live, i, j] = np.where(passer, PASSER, EATER)
+            last[live[passer]] = np.stack((i[passer], j[passer]), axis=1)
+            eater_turns[live[~passer]] += 1
+            passer_turn[live] = ~passer
+            won = passer & threats[np.arange(len(live)), i, j]  # A Passer wins by taking a winning cell
+            passer_won[live[won]] = True
+            eater = ~passer
+            if eater.any():
+                done_eater[live[eater]] = eater_won(boards[live[eater]])
+            alive[live[won]] = False
+            alive[live[eater]] &= ~done_eater[live[eater]]
+        rewards = np.zeros(len(boards))
+        rest = ~(passer_won | done_eater)
+        if rest.any():
+            row, _, steps = deepest(flood(boards[rest] == PASSER))
+            rewards[rest] = np.where(row >= 0, 1.0 / (steps + self.size - row + 1), 0.0)
+        rewards[done_eater] = 1.0
+        rewards[passer_won] = -1.0
+        return rewards
+
+    def choose(self, boards, passer_turn, eater_turns, last):
+        # One move per board as a flat cell index, its score (-inf when there's no legal move) and
+        # the Passer's winning cells the choice was made against
+        count, n = len(boards), self.size
+        passer = boards == PASSER
+        empty = boards == EMPTY
+        dist = flood(passer)
+        reach = dist < UNREACHED
+        threats = passer_threats(boards, reach)
+        row, col, _ = deepest(dist)
+
+        # Passer: the frontier cell below the chain's end, preferring straight down, then down-left, then down-right
+        end = np.zeros((count, n, n), bool)
+        below = row + 1
+        open_below = (row >= 0) & (below < n)
+        found = np.zeros(count, bool)
+        end_col = col.copy()
+        for step in (0, -1, 1):
+            target = col + step
+            ok = open_below & ~found & (target >= 0) & (target < n)
+            ok[ok] = boards[np.flatnonzero(ok), below[ok], target[ok]] != EATER
+            end_col[ok] = target[ok]
+            found |= ok
+        pick = np.flatnonzero(open_below)
+        end[pick, below[pick], end_col[pick]] = True
+        passer_scores = 1000 * threats + 100 * (end & empty) + 10 * (self.rows == n - 1)
+        passer_scores = np.where(empty, passer_scores, -np.inf)
+
+        # Eater: block a winning cell, else stay near the Passer's last move and overwrite on its turn
+        overwrite = (eater_turns % 3 == 2)[:, None, None]
+        legal = empty | (overwrite & passer)
+        distance = abs(self.rows - last[:, 0, None, None]) + abs(self.cols - last[:, 1, None, None])
+        eater_scores = (1000 * threats + np.where(distance <= 2, 20 / (distance + 1), 0)
+                        + (overwrite & passer) * (50 + 50 * reach))
+        eater_scores = np.where(legal, eater_scores, -np.inf)
+
+        scores = np.where(passer_turn[:, None, None], passer_scores, eater_scores)
+        explore = self.rng.random(count) < self.epsilon  # Any legal move
+        scores[explore] = np.where(np.isneginf(scores[explore]), -np.inf, 0)
+        scores = (scores + self.rng.random(scores.shape)).reshape(count, n * n)
+        moves = np.argmax(scores, axis=1)
+        return moves, scores[np.arange(count), moves], threats
@@ -0,0 +1,648 @@
+import argparse
+import random
+import time
+import tracemalloc
+
+import hard
+from hard import MCTS, MCTSNode
+from medium import MiniMaxPlayer
+from pns import ProofNumberSolver, empty_cells
+from book import OpeningBook
+from mincut import MinCut
+from treemcts import TreeParallelMCTS
+from evalcheck import reference_evaluate
+from rules import BACKENDS, GameState, drop_mirror_moves
+
+# Micro-benchmarks for the engines' hot paths. Run from the code folder:
+#   python benchmark.py nodes --sizes 9 13 19
+
+
+def random_node_walk(state, rng, seconds, with_path=True):
+    # Expands nodes the way the searches do (copy, move, win checks, path search) along random games
+    nodes = 0
+    root = state.copy()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        state = root.copy()
+        player = 'P'
+        while True:
+            state.current_player = player
+            legal_moves = state.get_legal_moves()
+            if not legal_moves:
+                break
+            child = state.copy()
+            child.make_move(rng.choice(legal_moves), player)
+            if with_path:
+                child.find_passer_path()
+            nodes += 1
+            if child.check_passer_win() or child.check_eater_win():
+                break
+            state = child
+            player = 'E' if player == 'P' else 'P'
+    return nodes
+
+
+def bench_nodes(sizes, seconds):
+    print(f"{'size':>5} {'backend':>9} {'nodes/sec':>12} {'+path/sec':>12}")
+    for size in sizes:
+        for name, backend in BACKENDS.items():
+            bare = random_node_walk(backend(size), random.Random(size), seconds, with_path=False)
+            full = random_node_walk(backend(size), random.Random(size), seconds)
+            print(f"{size:>5} {name:>9} {bare / seconds:>12.0f} {full / seconds:>12.0f}")
+
+
+def random_positions(count, size, seed, min_moves=2, max_moves=14, state_class=GameState):
+    # Mid-game positions with the Eater to move, reached by random play that stops before a win
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        state = state_class(size)
+        player = 'P'
+        for _ in range(rng.randint(min_moves, max_moves)):
+            state.current_player = player
+            state.make_move(rng.choice(state.get_legal_moves()), player)
+            if state.check_passer_win() or state.check_eater_win():
+                break
+            player = 'E' if player == 'P' else 'P'
+        else:
+            if player == 'E':
+                positions.append(state)
+    return positions
+
+
+def bench_tt(depths, count):
+    # Minimax with and without the transposition table on the same positions
+    positions = random_positions(count, 9, seed=7)
+    print(f"{'depth':>5} {'table':>6} {'nodes':>9} {'seconds':>8} {'hit rate':>9}  same moves")
+    for depth in depths:
+        results = {}
+        for table_size in (0, 200000):
+            player = MiniMaxPlayer(max_depth=depth, table_size=table_size)
+            nodes, moves = 0, []
+            start = time.perf_counter()
+            for state in positions:
+                moves.append(player.get_move(state))
+                nodes += player.nodes
+            elapsed = time.perf_counter() - start
+            results[table_size] = moves
+            hit_rate = f"{player.table.stats()['hit_rate']:.1%}" if player.table else '-'
+            print(f"{depth:>5} {'on' if table_size else 'off':>6} {nodes:>9} {elapsed:>8.2f} {hit_rate:>9}  "
+                  f"{results[table_size] == results[0]}")
+
+
+def bench_ordering(depths, count):
+    # Killer/history ordering in minimax's inner nodes against table-move-only ordering
+    positions = random_positions(count, 9, seed=7)
+    print(f"{'depth':>5} {'ordering':>8} {'nodes':>9} {'seconds':>8} {'first-move cutoffs':>18}  same moves")
+    for depth in depths:
+        results = {}
+        for ordering in (False, True):
+            player = MiniMaxPlayer(max_depth=depth, ordering=ordering)
+            nodes, cutoffs, first, moves = 0, 0, 0, []
+            start = time.perf_counter()
+            for state in positions:
+                moves.append(player.get_move(state))
+                nodes += player.nodes
+                cutoffs += player.cutoffs
+                first += player.first_move_cutoffs
+            elapsed = time.perf_counter() - start
+            results[ordering] = moves
+            rate = f"{first / cutoffs:.1%}" if cutoffs else '-'
+            print(f"{depth:>5} {'on' if ordering else 'off':>8} {nodes:>9} {elapsed:>8.2f} {rate:>18}  "
+                  f"{results[ordering] == results[False]}")
+
+
+def bench_deepening(budgets, count):
+    # Iterative deepening under a per-move time budget: depth reached and latency, opening included
+    positions = [GameState(9)] + random_positions(count - 1, 9, seed=11, min_moves=1, max_moves=20)
+    for state in positions:
+        state.current_player = 'E'
+    print(f"{'budget':>6} {'min depth':>9} {'max depth':>9} {'mean nodes':>10} {'max latency':>11}")
+    for budget in budgets:
+        depths, nodes, latencies = [], [], []
+        for state in positions:
+            player = MiniMaxPlayer(max_depth=None, time_budget=budget)
+            start = time.perf_counter()
+            player.get_move(state)
+            latencies.append(time.perf_counter() - start)
+            depths.append(player.depth_reached)
+            nodes.append(player.nodes)
+        print(f"{budget:>6} {min(depths):>9} {max(depths):>9} {sum(nodes) / len(nodes):>10.0f} {max(latencies):>11.2f}")
+
+
+def bench_parallel(depths, count, worker_counts):
+    # Root splitting over a process pool against the serial search at fixed depths: wall time,
+    # speedup and whether every chosen move matches the serial one
+    positions = random_positions(count, 9, seed=13)
+    print(f"{'depth':>5} {'workers':>7} {'nodes':>9} {'seconds':>8} {'speedup':>7}  same moves")
+    for depth in depths:
+        serial_moves, serial_time = None, None
+        for workers in [1] + [w for w in worker_counts if w > 1]:
+            player = MiniMaxPlayer(max_depth=depth, workers=workers)
+            nodes, moves = 0, []
+            start = time.perf_counter()
+            for state in positions:
+                moves.append(player.get_move(state))
+                nodes += player.nodes
+            elapsed = time.perf_counter() - start
+            player.close()
+            if serial_moves is None:
+                serial_moves, serial_time = moves, elapsed
+            print(f"{depth:>5} {workers:>7} {nodes:>9} {elapsed:>8.2f} {serial_time / elapsed:>7.2f}  "
+                  f"{moves == serial_moves}")
+
+
+def bench_pvs(depths, count, window):
+    # Principal variation search, alone and with aspiration windows, against plain alpha-beta
+    positions = random_positions(count, 9, seed=7)
+    modes = [('alpha-beta', {}), ('pvs', {'pvs': True}), ('pvs+asp', {'pvs': True, 'aspiration': window})]
+    print(f"{'depth':>5} {'search':>10} {'nodes':>9} {'seconds':>8} {'re-searches':>11} {'asp misses':>10}  same moves")
+    for depth in depths:
+        results = {}
+        for name, options in modes:
+            player = MiniMaxPlayer(max_depth=depth, **options)
+            nodes, researches, misses, moves = 0, 0, 0, []
+            start = time.perf_counter()
+            for state in positions:
+                moves.append(player.get_move(state))
+                nodes += player.nodes
+                researches += player.researches
+                misses += player.aspiration_misses
+            elapsed = time.perf_counter() - start
+            results[name] = moves
+            print(f"{depth:>5} {name:>10} {nodes:>9} {elapsed:>8.2f} {researches:>11} {misses:>10}  "
+                  f"{moves == results['alpha-beta']}")
+
+
+def bench_eval(seconds):
+    # Leaf evaluations per second: the incremental evaluate_board on each backend and the
+    # from-scratch reference, which also rebuilds the Passer path
+    player = MiniMaxPlayer()
+    evaluators = [(name, player.evaluate_board, random_positions(20, 9, seed=9, max_moves=30, state_class=backend))
+                  for name, backend in BACKENDS.items()]
+    evaluators.append(('scratch', lambda state: reference_evaluate(state.board), evaluators[0][2]))
+    for name, evaluate, positions in evaluators:
+        calls = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            evaluate(positions[calls % len(positions)])
+            calls += 1
+        print(f"{name:>9} evaluations/sec: {calls / seconds:.0f}")
+
+
+def opening_lines(count, size, plies, seed):
+    # Move sequences for the first plies of a game: the Passer heading straight down the middle
+    # column, then random Passer moves; the Eater replies with the depth-2 engine move each time
+    rng = random.Random(seed)
+    eater = MiniMaxPlayer(max_depth=2)
+    lines = []
+    for line in range(count):
+        state, moves = GameState(size), []
+        for ply in range(plies):
+            player = 'P' if ply % 2 == 0 else 'E'
+            state.current_player = player
+            if player == 'E':
+                move = eater.get_move(state)
+            elif line == 0 and state.is_legal((ply // 2, size // 2)):
+                move = (ply // 2, size // 2)
+            else:
+                move = rng.choice(state.get_legal_moves())
+            state.make_move(move, player)
+            moves.append(move)
+            if state.check_passer_win() or state.check_eater_win():
+                break
+        lines.append(moves)
+    return lines
+
+
+def bench_symmetry(depths, count, plies=10):
+    # Mirror symmetry over the first plies of a game: how often the Eater's position is symmetric,
+    # root moves before and after dropping mirror duplicates, and minimax nodes with and without
+    # symmetry (effective branching factor = nodes ** (1 / (depth + 1)))
+    lines = opening_lines(count, 9, plies, seed=17)
+    print(f"{'depth':>5} {'ply':>3} {'symmetric':>9} {'root moves':>10} {'kept':>5} {'nodes off':>9} {'nodes on':>9} "
+          f"{'ebf off':>7} {'ebf on':>7}  same moves")
+    for depth in depths:
+        for ply in range(1, plies, 2):  # Eater to move
+            states = []
+            for moves in lines:
+                if len(moves) > ply:
+                    state = GameState(9)
+                    for k, move in enumerate(moves[:ply]):
+                        state.current_player = 'P' if k % 2 == 0 else 'E'
+                        state.make_move(move, state.current_player)
+                    state.current_player = 'E'
+                    states.append(state)
+            symmetric = [state for state in states if state.is_mirror_symmetric()]
+            root = sum(len(state.legal_moves_view()) for state in states)
+            kept = root - sum(len(state.legal_moves_view()) - len(drop_mirror_moves(state.legal_moves_view(), 9))
+                              for state in symmetric)
+            nodes, chosen = {}, {}
+            for symmetry in (False, True):
+                player = MiniMaxPlayer(max_depth=depth, symmetry=symmetry)
+                nodes[symmetry], chosen[symmetry] = 0, []
+                for state in states:
+                    chosen[symmetry].append(player.get_move(state))
+                    nodes[symmetry] += player.nodes
+            ebf = {key: (value / len(states)) ** (1 / (depth + 1)) for key, value in nodes.items()}
+            print(f"{depth:>5} {ply:>3} {len(symmetric):>4}/{len(states):<4} {root:>10} {kept:>5} {nodes[False]:>9} "
+                  f"{nodes[True]:>9} {ebf[False]:>7.1f} {ebf[True]:>7.1f}  {chosen[False] == chosen[True]}")
+
+
+def late_positions(count, size, seed, max_empty):
+    # Eater-to-move positions of random games once fewer than max_empty cells are empty
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        state = GameState(size)
+        player = 'P'
+        while True:
+            state.current_player = player
+            state.make_move(rng.choice(state.get_legal_moves()), player)
+            if state.check_passer_win() or state.check_eater_win():
+                break
+            player = 'E' if player == 'P' else 'P'
+            if player == 'E' and empty_cells(state) < max_empty and rng.random() < 0.3:
+                state.current_player = 'E'
+                positions.append(state)
+                break
+    return positions
+
+
+def bench_endgame(count, empties, seconds):
+    # Proof-number solver on late positions: outcome, effort and proof size by empty cells left
+    print(f"{'empty':>5} {'winner':>6} {'nodes':>8} {'proof':>7} {'seconds':>8}")
+    for state in sorted(late_positions(count, 9, seed=5, max_empty=empties), key=empty_cells):
+        solver = ProofNumberSolver(max_nodes=10 ** 7, time_limit=seconds)
+        start = time.perf_counter()
+        winner = solver.solve(state)
+        elapsed = time.perf_counter() - start
+        proof = solver.proof_size if winner else '-'
+        print(f"{empty_cells(state):>5} {winner or 'limit':>6} {solver.nodes:>8} {proof:>7} {elapsed:>8.2f}")
+
+
+def bench_book(seconds):
+    # Opening book: time to map the file and per-probe cost for positions in and out of the book,
+    # against the MCTS search hard mode would otherwise run on the same first replies
+    start = time.perf_counter()
+    book = OpeningBook()
+    opened = time.perf_counter() - start
+    positions = []
+    for i in range(9):
+        for j in range(9):
+            state = GameState(9)
+            state.make_move((i, j), 'P')
+            state.current_player = 'E'
+            positions.append(state)
+    hits = sum(book.probe(state) is not None for state in positions)
+    print(f"{len(book)} positions, mapped in {opened * 1e6:.0f} us, {hits}/{len(positions)} first replies in the book")
+    for label, probes in (('hit', positions), ('miss', random_positions(20, 9, seed=1, min_moves=6))):
+        calls = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            book.probe(probes[calls % len(probes)])
+            calls += 1
+        print(f"{label:>5} probe: {seconds / calls * 1e6:.1f} us")
+    random.seed(0)
+    start = time.perf_counter()
+    MCTS(iterations=1000).search(positions[4])
+    print(f" MCTS: {(time.perf_counter() - start) * 1e6:.0f} us for one 1000-iteration search")
+
+
+def scan_winning_moves(state):
+    # The per-move scan eater_winning_moves replaced: play each legal move and check for the win
+    wins = []
+    for move in state.get_legal_moves():
+        state.make_move(move, 'E')
+        if state.check_eater_win():
+            wins.append(move)
+        state.unmake_move()
+    return wins
+
+
+def bench_wins(count, seconds):
+    # All of the Eater's immediate wins: one dominator pass against trying every legal move, per backend
+    positions = late_positions(count, 9, seed=7, max_empty=40)
+    for name, backend in BACKENDS.items():
+        states = positions if backend is GameState else [backend.from_state(state) for state in positions]
+        rates = []
+        for find in (scan_winning_moves, lambda state: state.eater_winning_moves()):
+            calls = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                find(states[calls % len(states)])
+                calls += 1
+            rates.append(calls / seconds)
+        print(f"{name:>8}: scan {rates[0]:>9.1f}/s, one pass {rates[1]:>9.1f}/s ({rates[1] / rates[0]:.1f}x)")
+
+
+def scan_passer_threats(state):
+    # Finding the Passer's winning cells by playing each empty cell and checking for the win
+    threats = []
+    for i, j in state.get_legal_moves():
+        if state.board[i][j] is None:
+            state.make_move((i, j), 'P')
+            if state.check_passer_win():
+                threats.append((i, j))
+            state.unmake_move()
+    return threats
+
+
+def bench_threats(count, seconds):
+    # The Passer's winning cells: two floods against trying every empty cell, per backend, with the
+    # cache cleared so every call does the work
+    positions = late_positions(count, 9, seed=8, max_empty=40)
+    for name, backend in BACKENDS.items():
+        states = positions if backend is GameState else [backend.from_state(state) for state in positions]
+        rates = []
+        for find in (scan_passer_threats, lambda state: state.passer_threats()):
+            calls = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                state = states[calls % len(states)]
+                state.threat_cache = None
+                find(state)
+                calls += 1
+            rates.append(calls / seconds)
+        print(f"{name:>8}: scan {rates[0]:>9.1f}/s, floods {rates[1]:>9.1f}/s ({rates[1] / rates[0]:.1f}x)")
+
+
+def bench_cut(count):
+    # Min-cut ranking along random games: the packing synced move by move (take-backs included)
+    # against a fresh max-flow for every position
+    rng = random.Random(6)
+    games = []
+    for _ in range(count):
+        state = GameState(9)
+        masks = []
+        player = 'P'
+        while not (state.check_passer_win() or state.check_eater_win()):
+            state.current_player = player
+            state.make_move(rng.choice(state.get_legal_moves()), player)
+            masks.append(state.open_mask)
+            if rng.random() < 0.2:
+                state.unmake_move()
+                masks.append(state.open_mask)
+                continue
+            player = 'E' if player == 'P' else 'P'
+        games.append(masks)
+    positions = sum(len(masks) for masks in games)
+    for label, shared in (('incremental', True), ('fresh', False)):
+        start = time.perf_counter()
+        for masks in games:
+            cut = MinCut(9)
+            for mask in masks:
+                if not shared:
+                    cut = MinCut(9)
+                cut.ranking(mask)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>11}: {elapsed / positions * 1e6:7.0f} us per position ({positions} positions)")
+
+
+def bench_rollouts(seconds):
+    # MCTS._simulate throughput (hard mode rollouts, max_depth 8) over a fixed set of positions
+    positions = random_positions(20, 9, seed=3, max_moves=20, state_class=GameState)
+    mcts = MCTS()
+    random.seed(0)
+    rollouts = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        mcts._simulate(positions[rollouts % len(positions)])
+        rollouts += 1
+    print(f"rollouts/sec: {rollouts / seconds:.1f}")
+
+
+def bench_batch(count, seconds, batches):
+    # Lockstep rollouts on a board tensor against one _simulate at a time: a batch of B rollouts from
+    # one leaf, and B leaves with one rollout each
+    from batchrollouts import BatchRollouts
+    positions = random_positions(count + max(batches), 9, seed=3, max_moves=20)
+    for state in positions:
+        state.current_player = 'E'
+    mcts = MCTS()
+    rollouts = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        mcts._simulate(positions[rollouts % count])
+        rollouts += 1
+    print(f"{'_simulate':>16}: {rollouts / seconds:9.1f} rollouts/s")
+    engine = BatchRollouts(9, seed=0)
+    for batch in batches:
+        shapes = [(f"1 leaf x {batch}", 1, batch)] + ([(f"{batch} leaves x 1", batch, 1)] if batch > 1 else [])
+        for label, leaves, repeats in shapes:
+            rollouts = 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < seconds:
+                first = rollouts // batch % count
+                engine.evaluate(positions[first:first + leaves], repeats)
+                rollouts += batch
+            print(f"{label:>16}: {rollouts / (time.perf_counter() - start):9.1f} rollouts/s")
+
+
+def bench_scoring(count, seconds):
+    # The rollout Eater's move choice: scoring every legal move with its own make/unmake against
+    # one batched pass (NumPy when importable), per backend
+    positions = random_positions(count, 9, seed=3, max_moves=20)
+    mcts = MCTS()
+    print(f"batched pass: {'NumPy' if hard.np is not None else 'plain Python'}")
+    for name, backend in BACKENDS.items():
+        states = [state.copy() if backend is GameState else backend.from_state(state) for state in positions]
+        for state in states:
+            state.current_player = 'E'
+        rates = []
+        for choose in (lambda state: max(state.legal_moves_view(), key=lambda move: mcts._score_move_for_eater(state, move)),
+                       mcts._best_eater_move):
+            calls = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                choose(states[calls % len(states)])
+                calls += 1
+            rates.append(calls / seconds)
+        print(f"{name:>8}: per move {rates[0]:>8.1f}/s, batched {rates[1]:>8.1f}/s ({rates[1] / rates[0]:.1f}x)")
+
+
+def bench_priority(seconds):
+    # MCTSNode move selection, which tests legal-move membership a few dozen times per call
+    positions = random_positions(20, 9, seed=5, max_moves=20, state_class=GameState)
+    node = MCTSNode(positions[0])
+    random.seed(0)
+    calls = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        node.get_priority_moves(positions[calls % len(positions)])
+        calls += 1
+    print(f"get_priority_moves/sec: {calls / seconds:.1f}")
+
+
+def bench_root_parallel(count, iterations, worker_counts):
+    # Root-parallel MCTS from 1 worker up: each worker grows a full tree of `iterations`, so
+    # throughput (tree iterations per second over all workers) is what should scale with cores
+    positions = random_positions(count, 9, seed=14, max_moves=16)
+    print(f"{'workers':>7} {'seconds':>8} {'iterations/sec':>14} {'scaling':>7}")
+    base = None
+    for workers in [1] + [w for w in worker_counts if w > 1]:
+        random.seed(0)
+        mcts = MCTS(iterations=iterations, workers=workers)
+        if workers > 1:
+            mcts.search(positions[0])  # Starts the pool outside the timing
+        start = time.perf_counter()
+        for state in positions:
+            mcts.search(state)
+        elapsed = time.perf_counter() - start
+        mcts.close()
+        rate = workers * iterations * len(positions) / elapsed
+        base = base or rate
+        print(f"{workers:>7} {elapsed:>8.2f} {rate:>14.0f} {rate / base:>7.2f}")
+
+
+def bench_tree_parallel(count, seconds, worker_counts, reference_iterations):
+    # Tree-parallel MCTS against the single-process search at the same wall time per move:
+    # iterations per second, and how often the move matches a long single-process reference search
+    positions = random_positions(count, 9, seed=15, max_moves=16)
+    random.seed(0)
+    reference = [MCTS(iterations=reference_iterations).search(state) for state in positions]
+    print(f"{'search':>12} {'iterations/sec':>14} {'matches reference':>17}")
+    searchers = [('single', MCTS(iterations=None, time_budget=seconds))]
+    searchers += [(f'tree x{w}', TreeParallelMCTS(iterations=None, time_budget=seconds, workers=w))
+                  for w in worker_counts if w > 1]
+    for label, searcher in searchers:
+        random.seed(0)
+        if isinstance(searcher, TreeParallelMCTS):
+            searcher.search(positions[0], 0.01)  # Starts the pool outside the timing
+        iterations, matches = 0, 0
+        start = time.perf_counter()
+        for state, expected in zip(positions, reference):
+            matches += searcher.search(state) == expected
+            iterations += searcher.iterations_run
+        elapsed = time.perf_counter() - start
+        if isinstance(searcher, TreeParallelMCTS):
+            searcher.close()
+        print(f"{label:>12} {iterations / elapsed:>14.0f} {matches:>12}/{len(positions)}")
+
+
+def scripted_passer(state, rng):
+    # Stand-in for the human: win when one marker does it, extend the deepest chain, start a chain
+    # near the middle of the top row when there is none, else play anywhere
+    threats = state.passer_threats()
+    if threats:
+        return threats[0]
+    path, end = state.find_passer_path()
+    if end and state.is_legal(end):
+        return end
+    top = [(0, j) for j in range(state.size) if state.is_legal((0, j))]
+    if top and not path:
+        return min(top, key=lambda move: abs(move[1] - state.size // 2))
+    return rng.choice(state.get_legal_moves())
+
+
+def bench_reuse(games, iterations):
+    # MCTS games against the scripted Passer, with a fresh tree every turn and with the tree kept
+    # between turns; the iteration cap bounds root visits either way, so playing strength matches
+    print(f"{'tree':>6} {'games':>5} {'eater wins':>10} {'moves':>6} {'visits kept':>11} {'ms/move':>8}")
+    for reuse in (False, True):
+        mcts = MCTS(iterations=iterations, reuse=reuse)
+        wins = moves = carried = 0
+        elapsed = 0.0
+        for game in range(games):
+            rng = random.Random(game)
+            random.seed(game)
+            state = GameState(9)
+            while True:
+                state.current_player = 'P'
+                state.make_move(scripted_passer(state, rng), 'P')
+                if state.check_passer_win():
+                    break
+                state.current_player = 'E'
+                start = time.perf_counter()
+                move = mcts.search(state)
+                elapsed += time.perf_counter() - start
+                moves += 1
+                carried += mcts.carried
+                state.make_move(move, 'E')
+                if state.check_eater_win():
+                    wins += 1
+                    break
+        label = 'kept' if reuse else 'fresh'
+        print(f"{label:>6} {games:>5} {wins:>10} {moves:>6} {carried / moves:>11.0f} {elapsed / moves * 1e3:>8.0f}")
+
+
+def count_nodes(root):
+    nodes, stack = 0, [root]
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        stack.extend(node.children or ())
+    return nodes
+
+
+def bench_memory(iterations):
+    # Bytes the finished MCTS tree keeps alive per node, and the peak while it is being built
+    state = random_positions(1, 9, seed=4, max_moves=16, state_class=GameState)[0]
+    print(f"{'iterations':>10} {'nodes':>7} {'tree bytes':>11} {'bytes/node':>11} {'peak bytes':>11}")
+    for count in iterations:
+        random.seed(0)
+        tracemalloc.start()
+        root = MCTS(iterations=count)._grow(state)
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        nodes = count_nodes(root)
+        print(f"{count:>10} {nodes:>7} {retained:>11} {retained / nodes:>11.0f} {peak:>11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Passer-Eater engine benchmarks")
+    parser.add_argument("bench", choices=["nodes", "tt", "ordering", "deepening", "parallel", "pvs", "eval",
+                                          "symmetry", "endgame", "book", "wins", "threats", "cut", "reuse", "rootpar", "treepar", "rollouts", "scoring", "batch", "priority", "memory"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[9, 13, 19])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--positions", type=int, default=5)
+    parser.add_argument("--iterations", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--budgets", type=float, nargs="+", default=[0.5, 2.0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 64, 1024])
+    parser.add_argument("--window", type=float, default=20.0)
+    parser.add_argument("--empty", type=int, default=22)
+    args = parser.parse_args()
+    if args.bench == "nodes":
+        bench_nodes(args.sizes, args.seconds)
+    elif args.bench == "tt":
+        bench_tt(args.depths, args.positions)
+    elif args.bench == "ordering":
+        bench_ordering(args.depths, args.positions)
+    elif args.bench == "deepening":
+        bench_deepening(args.budgets, args.positions)
+    elif args.bench == "parallel":
+        bench_parallel(args.depths, args.positions, args.workers)
+    elif args.bench == "pvs":
+        bench_pvs(args.depths, args.positions, args.window)
+    elif args.bench == "eval":
+        bench_eval(args.seconds)
+    elif args.bench == "symmetry":
+        bench_symmetry(args.depths, args.positions)
+    elif args.bench == "endgame":
+        bench_endgame(args.positions, args.empty, args.seconds)
+    elif args.bench == "book":
+        bench_book(args.seconds)
+    elif args.bench == "wins":
+        bench_wins(args.positions, args.seconds)
+    elif args.bench == "threats":
+        bench_threats(args.positions, args.seconds)
+    elif args.bench == "cut":
+        bench_cut(args.positions)
+    elif args.bench == "reuse":
+        bench_reuse(args.positions, args.iterations[0])
+    elif args.bench == "rootpar":
+        bench_root_parallel(args.positions, args.iterations[0], args.workers)
+    elif args.bench == "treepar":
+        bench_tree_parallel(args.positions, args.seconds, args.workers, args.iterations[-1])
+    elif args.bench == "rollouts":
+        bench_rollouts(args.seconds)
+    elif args.bench == "scoring":
+        bench_scoring(args.positions, args.seconds)
+    elif args.bench == "batch":
+        bench_batch(args.positions, args.seconds, args.batches)
+    elif args.bench == "priority":
+        bench_priority(args.seconds)
+    elif args.bench == "memory":
+        bench_memory(args.iterations)
@@ -0,0 +1,279 @@
+# Cell (i, j) is bit i * size + j. Passer and Eater cells are kept in two int masks, so copying a
+# state is a handful of int assignments and connectivity is a shift-and-mask flood fill.
+
+from connectivity import (PasserChain, get_geometry, flood, iter_cells, cells_tuple, cut_cells, threat_cells,
+                          double_threat_cells)
+from mincut import MinCut
+from zobrist import get_keys
+
+
+class BitboardGameState:
+    __slots__ = ('size', 'geometry', 'passer_mask', 'eater_mask', 'turns', 'passer_win_cache', 'eater_win_cache',
+                 'last_move', 'passer_last_move', '_board', 'undo_stack', 'keys', 'cell_hash', 'mirror_hash',
+                 'passer_chain', 'moves_mask', 'moves_view', 'min_cut', 'threat_cache')
+
+    def __init__(self, size):
+        self.size = size
+        self.geometry = get_geometry(size)
+        self.passer_mask = 0
+        self.eater_mask = 0
+        self.turns = 0  # bit 0: side to move (0 = 'P', 1 = 'E'), higher bits: eater_turn_count
+        self.passer_win_cache = None
+        self.eater_win_cache = None
+        self.threat_cache = None  # (Passer threats, double threats or None) for this position
+        self.last_move = None
+        self.passer_last_move = None
+        self._board = None  # list-of-lists view, rebuilt lazily after a move
+        self.undo_stack = []  # One record per make_move, popped by unmake_move
+        self.keys = get_keys(size)
+        self.cell_hash = 0  # Zobrist hash of the cells, kept up to date by make_move
+        self.mirror_hash = 0  # The same hash of the board with its columns reversed
+        self.passer_chain = PasserChain(size)  # Row-by-row DP behind find_passer_path
+        self.moves_mask = None  # Mask the cached moves_view was built from
+        self.moves_view = ()
+        self.min_cut = None  # Route packing behind cut_ranking, made on first use
+
+    @classmethod
+    def from_state(cls, state):
+        # Bitboard copy of a position held by any backend; move history isn't carried over
+        new_state = cls(state.size)
+        n, keys = state.size, new_state.keys
+        for i, row in enumerate(state.board):
+            for j, cell in enumerate(row):
+                if cell is not None:
+                    cells = keys.passer if cell == 'P' else keys.eater
+                    if cell == 'P':
+                        new_state.passer_mask |= 1 << (i * n + j)
+                    else:
+                        new_state.eater_mask |= 1 << (i * n + j)
+                    new_state.cell_hash ^= cells[i * n + j]
+                    new_state.mirror_hash ^= cells[i * n + n - 1 - j]
+        new_state.current_player = state.current_player
+        new_state.eater_turn_count = state.eater_turn_count
+        new_state.passer_last_move = state.get_passer_last_move()
+        return new_state
+
+    @property
+    def current_player(self):
+        return 'E' if self.turns & 1 else 'P'
+
+    @current_player.setter
+    def current_player(self, player):
+        self.turns = (self.turns & ~1) | (player == 'E')
+
+    @property
+    def eater_turn_count(self):
+        return self.turns >> 1
+
+    @eater_turn_count.setter
+    def eater_turn_count(self, count):
+        self.turns = (count << 1) | (self.turns & 1)
+
+    @property
+    def board(self):
+        # Read-only view with the same None/'P'/'E' cells as the list board, for callers that index it
+        if self._board is None:
+            n = self.size
+            board = [[None] * n for _ in range(n)]
+            for i, j in iter_cells(self.passer_mask, self.geometry):
+                board[i][j] = 'P'
+            for i, j in iter_cells(self.eater_mask, self.geometry):
+                board[i][j] = 'E'
+            self._board = board
+        return self._board
+
+    def cell(self, i, j):
+        bit = 1 << (i * self.size + j)
+        if self.passer_mask & bit:
+            return 'P'
+        if self.eater_mask & bit:
+            return 'E'
+        return None
+
+    # The evaluation terms GameState keeps as counters are a few popcounts here
+    @property
+    def row_eaters(self):
+        eater = self.eater_mask
+        return [(eater & row).bit_count() for row in self.geometry.row_masks]
+
+    @property
+    def col_eaters(self):
+        eater = self.eater_mask
+        return [(eater & col).bit_count() for col in self.geometry.col_masks]
+
+    @property
+    def passer_links(self):
+        # Passer cells whose down, left, right, down-left or down-right neighbour is a Passer cell,
+        # counted once per direction
+        p, n, geometry = self.passer_mask, self.size, self.geometry
+        return ((p & (p >> n)).bit_count()
+                + (p & (p << 1) & geometry.not_first_col).bit_count()
+                + (p & (p >> 1) & geometry.not_last_col).bit_count()
+                + (p & (p >> (n - 1)) & geometry.not_first_col).bit_count()
+                + (p & (p >> (n + 1)) & geometry.not_last_col).bit_count())
+
+    def legal_mask(self):
+        if self.turns & 1 and self.eater_turn_count % 3 == 2:
+            return self.geometry.full & ~self.eater_mask  # Overwrite turn: any cell the Eater doesn't hold
+        return self.geometry.full & ~(self.passer_mask | self.eater_mask)
+
+    def legal_moves_view(self):
+        # Immutable tuple of legal moves, rebuilt only when the legal mask changes
+        mask = self.legal_mask()
+        if mask != self.moves_mask:
+            self.moves_mask = mask
+            self.moves_view = cells_tuple(mask, self.geometry)
+        return self.moves_view
+
+    def get_legal_moves(self):
+        return list(self.legal_moves_view())
+
+    def is_legal(self, move):
+        i, j = move
+        if not (0 <= i < self.size and 0 <= j < self.size):
+            return False
+        return bool(self.legal_mask() >> (i * self.size + j) & 1)
+
+    def eater_winning_moves(self):
+        # Cells where the Eater's next marker wins, in row-major order (see GameState)
+        geometry = self.geometry
+        open_cells = geometry.full & ~self.eater_mask
+        wins = cut_cells(open_cells, geometry)
+        for row in geometry.row_masks:
+            if (self.eater_mask & row).bit_count() == self.size - 1:
+                wins |= row
+        if self.eater_turn_count % 3 == 2:
+            legal = open_cells
+        else:
+            legal = open_cells & ~self.passer_mask
+        return cells_tuple(wins & legal, geometry)
+
+    def passer_threats(self):
+        # Empty cells where a Passer marker completes a top-to-bottom path (see GameState)
+        if self.threat_cache is None:
+            empty = self.geometry.full & ~(self.passer_mask | self.eater_mask)
+            self.threat_cache = (cells_tuple(threat_cells(self.passer_mask, empty, self.geometry), self.geometry), None)
+        return self.threat_cache[0]
+
+    def passer_double_threats(self):
+        threats = self.passer_threats()
+        if self.threat_cache[1] is None:
+            empty = self.geometry.full & ~(self.passer_mask | self.eater_mask)
+            doubles = double_threat_cells(self.passer_mask, empty, self.geometry)
+            self.threat_cache = (threats, cells_tuple(doubles, self.geometry))
+        return self.threat_cache[1]
+
+    def cut_ranking(self):
+        # Per cell, what an Eater marker there does to the disjoint top-to-bottom routes (see GameState)
+        if self.min_cut is None:
+            self.min_cut = MinCut(self.size)
+        return self.min_cut.ranking(self.geometry.full & ~self.eater_mask)
+
+    def make_move(self, move, player):
+        i, j = move
+        bit = 1 << (i * self.size + j)
+        self.undo_stack.append((self.passer_mask, self.eater_mask, self.turns, self.last_move, self.passer_last_move,
+                                self.passer_win_cache, self.eater_win_cache, self.threat_cache, self.cell_hash,
+                                self.mirror_hash))
+        self.last_move = (move, player)
+        self.passer_win_cache = None
+        self.eater_win_cache = None
+        self.threat_cache = None
+        self._board = None
+        if player == 'E':
+            if self.passer_mask & bit:
+                self.cell_hash ^= self.keys.passer[i * self.size + j]
+                self.mirror_hash ^= self.keys.passer[i * self.size + self.size - 1 - j]
+                self.passer_chain.touch(i)
+            if not self.eater_mask & bit:
+                self.cell_hash ^= self.keys.eater[i * self.size + j]
+                self.mirror_hash ^= self.keys.eater[i * self.size + self.size - 1 - j]
+            self.eater_mask |= bit
+            self.passer_mask &= ~bit
+            self.turns += 2
+        elif player == 'P' and not (self.passer_mask | self.eater_mask) & bit:
+            self.passer_mask |= bit
+            self.cell_hash ^= self.keys.passer[i * self.size + j]
+            self.mirror_hash ^= self.keys.passer[i * self.size + self.size - 1 - j]
+            self.passer_chain.touch(i)
+            self.passer_last_move = (i, j)
+
+    def unmake_move(self):
+        # The whole position is a few ints, so a record restores it exactly, overwrites included
+        passer_mask, row = self.passer_mask, self.last_move[0][0]
+        (self.passer_mask, self.eater_mask, self.turns, self.last_move, self.passer_last_move,
+         self.passer_win_cache, self.eater_win_cache, self.threat_cache, self.cell_hash,
+         self.mirror_hash) = self.undo_stack.pop()
+        if passer_mask != self.passer_mask:
+            self.passer_chain.touch(row)
+        self._board = None
+
+    def check_passer_win(self):
+        if self.passer_win_cache is None:
+            geometry = self.geometry
+            reach = flood(self.passer_mask & geometry.top, self.passer_mask, geometry)
+            self.passer_win_cache = bool(reach & geometry.bottom)
+        return self.passer_win_cache
+
+    def check_eater_win(self):
+        if self.eater_win_cache is not None:
+            return self.eater_win_cache
+
+        geometry = self.geometry
+        eater = self.eater_mask
+        if any(eater & row == row for row in geometry.row_masks):  # Eater has filled a row
+            self.eater_win_cache = True
+            return True
+
+        open_cells = geometry.full & ~eater
+        reach = flood(open_cells & geometry.top, open_cells, geometry)
+        self.eater_win_cache = not reach & geometry.bottom
+        return self.eater_win_cache
+
+    def find_passer_path(self):
+        return self.passer_chain.path(self.board)
+
+    def display(self):
+        print('   ', ' '.join(str(i + 1) for i in range(self.size)))
+        for i in range(self.size):
+            row = [self.cell(i, j) or '|' for j in range(self.size)]
+            print(f'{i + 1:2} ', ' '.join(row))
+
+    def zobrist_key(self):
+        return self.cell_hash ^ self.keys.side[self.current_player] ^ self.keys.turn[self.eater_turn_count % 3]
+
+    def canonical_key(self):
+        # (key, mirrored): the smaller of the position's and its mirror image's keys
+        turn = self.keys.side[self.current_player] ^ self.keys.turn[self.eater_turn_count % 3]
+        if self.mirror_hash < self.cell_hash:
+            return self.mirror_hash ^ turn, True
+        return self.cell_hash ^ turn, False
+
+    def is_mirror_symmetric(self):
+        return self.cell_hash == self.mirror_hash
+
+    def get_passer_last_move(self):
+        return self.passer_last_move
+
+    def copy(self):
+        new_state = BitboardGameState.__new__(BitboardGameState)
+        new_state.size = self.size
+        new_state.geometry = self.geometry
+        new_state.passer_mask = self.passer_mask
+        new_state.eater_mask = self.eater_mask
+        new_state.turns = self.turns
+        new_state.passer_win_cache = self.passer_win_cache
+        new_state.eater_win_cache = self.eater_win_cache
+        new_state.threat_cache = self.threat_cache
+        new_state.last_move = self.last_move
+        new_state.passer_last_move = self.passer_last_move
+        new_state._board = None
+        new_state.undo_stack = []
+        new_state.keys = self.keys
+        new_state.cell_hash = self.cell_hash
+        new_state.mirror_hash = self.mirror_hash
+        new_state.passer_chain = self.passer_chain.copy()
+        new_state.moves_mask = self.moves_mask
+        new_state.moves_view = self.moves_view
+        new_state.min_cut = self.min_cut
+        return new_state
@@ -0,0 +1,132 @@
+import argparse
+import mmap
+import os
+import struct
+from bisect import bisect_left
+
+from rules import GameState, mirror_move, drop_mirror_moves
+
+# Opening book: Eater replies for the first plies of a game, searched offline and stored as a sorted
+# array of (canonical Zobrist key, row, col) records. Lookups mmap the file and binary-search it, so
+# nothing is read up front and a probe touches a handful of pages. Keys are canonical, so a position
+# and its mirror image share a record; the move is stored as played in the canonical orientation.
+# Build it from the code folder:
+#   python book.py --plies 2 --depth 4
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+MAGIC = b'PEBK'
+HEADER = struct.Struct('<4sHHI')  # magic, format version, board size, record count
+RECORD = struct.Struct('<QBB')  # canonical key, row, col
+VERSION = 1
+
+
+class _Keys:
+    # The record keys as a read-only sequence, so bisect can search the mapped file in place
+    def __init__(self, data, count):
+        self.data = data
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return RECORD.unpack_from(self.data, HEADER.size + index * RECORD.size)[0]
+
+
+class OpeningBook:
+    def __init__(self, path=BOOK_PATH):
+        self.path = path
+        self.data = None
+        self.size = None
+        self.keys = _Keys(b'', 0)
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+            with open(path, 'rb') as book_file:
+                self.data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.size, count = HEADER.unpack_from(self.data)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not an opening book this version can read")
+            self.keys = _Keys(self.data, count)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def probe(self, state):
+        # The book move for this position, or None when it isn't in the book
+        if state.size != self.size:
+            return None
+        key, mirrored = state.canonical_key()
+        index = bisect_left(self.keys, key)
+        if index == len(self.keys) or self.keys[index] != key:
+            return None
+        _, i, j = RECORD.unpack_from(self.data, HEADER.size + index * RECORD.size)
+        move = mirror_move((i, j), state.size) if mirrored else (i, j)
+        return move if state.is_legal(move) else None  # Guards against a key collision
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+            self.keys = _Keys(b'', 0)
+
+
+_BOOKS = {}
+
+
+def book_move(state, path=BOOK_PATH):
+    # Probes the book at `path`, mapping it on first use in this process
+    book = _BOOKS.get(path)
+    if book is None:
+        book = _BOOKS[path] = OpeningBook(path)
+    return book.probe(state)
+
+
+def write_book(entries, size, path):
+    # entries: {canonical key: canonical move}
+    with open(path, 'wb') as book_file:
+        book_file.write(HEADER.pack(MAGIC, VERSION, size, len(entries)))
+        for key in sorted(entries):
+            book_file.write(RECORD.pack(key, *entries[key]))
+
+
+def build_book(size=9, plies=2, depth=4, path=BOOK_PATH):
+    # Walks every Passer move (one per mirror pair at symmetric positions) and the searched Eater
+    # reply for the first `plies` plies, then writes the Eater replies; returns the record count
+    from medium import MiniMaxPlayer  # The engines import this module, so the searcher is imported late
+    player = MiniMaxPlayer(max_depth=depth)
+    entries = {}
+    seen = set()
+
+    def walk(state, ply):
+        key, mirrored = state.canonical_key()
+        if ply >= plies or key in seen or state.check_passer_win() or state.check_eater_win():
+            return
+        seen.add(key)
+        if state.current_player == 'E':
+            move = player.get_move(state)
+            entries[key] = mirror_move(move, size) if mirrored else move
+            replies = [move]
+        else:
+            replies = state.get_legal_moves()
+            if state.is_mirror_symmetric():
+                replies = drop_mirror_moves(replies, size)
+        player_to_move = state.current_player
+        for move in replies:
+            state.make_move(move, player_to_move)
+            state.current_player = 'P' if player_to_move == 'E' else 'E'
+            walk(state, ply + 1)
+            state.unmake_move()
+
+    walk(GameState(size), 0)
+    write_book(entries, size, path)
+    return len(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the Eater's opening book")
+    parser.add_argument("--size", type=int, default=9)
+    parser.add_argument("--plies", type=int, default=2)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--output", default=BOOK_PATH)
+    args = parser.parse_args()
+    count = build_book(args.size, args.plies, args.depth, args.output)
+    print(f"Wrote {count} positions to {args.output}")
@@ -0,0 +1,246 @@
+import argparse
+import random
+import sys
+from multiprocessing import Pool
+
+from connectivity import NEIGHBOURS
+from rules import BACKENDS
+from zobrist import board_hash
+
+# Differential conformance run for the rules engine: every backend plays the same random move
+# sequences (with random take-backs) in lockstep and must agree with the others and with the plain
+# reference rules below after every move. Run from the code folder:
+#   python conformance.py --games 1000000 --workers 8
+
+
+def reference_legal_moves(board, player, eater_turn_count):
+    size = len(board)
+    if player == 'E' and eater_turn_count % 3 == 2:  # Overwrite turn: any cell the Eater doesn't hold
+        return [(i, j) for i in range(size) for j in range(size) if board[i][j] != 'E']
+    return [(i, j) for i in range(size) for j in range(size) if board[i][j] is None]
+
+
+def reference_reach(board, passable):
+    # Cells with passable(cell) reachable from the top row using the Passer's move rule
+    size = len(board)
+    stack = [(0, j) for j in range(size) if passable(board[0][j])]
+    seen = set(stack)
+    while stack:
+        i, j = stack.pop()
+        for di, dj in NEIGHBOURS:
+            ni, nj = i + di, j + dj
+            if 0 <= ni < size and 0 <= nj < size and (ni, nj) not in seen and passable(board[ni][nj]):
+                seen.add((ni, nj))
+                stack.append((ni, nj))
+    return seen
+
+
+def reference_passer_win(board):
+    size = len(board)
+    return any(i == size - 1 for i, _ in reference_reach(board, lambda cell: cell == 'P'))
+
+
+def reference_eater_win(board):
+    size = len(board)
+    if any(all(cell == 'E' for cell in row) for row in board):
+        return True
+    return not any(i == size - 1 for i, _ in reference_reach(board, lambda cell: cell != 'E'))
+
+
+def reference_eater_winning_moves(board, eater_turn_count):
+    # Every Eater move that wins straight away, by trying each one
+    wins = []
+    for i, j in reference_legal_moves(board, 'E', eater_turn_count):
+        cell, board[i][j] = board[i][j], 'E'
+        if reference_eater_win(board):
+            wins.append((i, j))
+        board[i][j] = cell
+    return wins
+
+
+def reference_passer_threats(board):
+    # Empty cells where a Passer marker wins straight away, by trying each one
+    threats = []
+    for i, j in reference_legal_moves(board, 'P', 0):
+        board[i][j] = 'P'
+        if reference_passer_win(board):
+            threats.append((i, j))
+        board[i][j] = None
+    return threats
+
+
+def reference_double_threats(board):
+    # Empty non-winning cells after which at least two threats are left
+    threats = reference_passer_threats(board)
+    doubles = []
+    for i, j in reference_legal_moves(board, 'P', 0):
+        if (i, j) not in threats:
+            board[i][j] = 'P'
+            if len(reference_passer_threats(board)) >= 2:
+                doubles.append((i, j))
+            board[i][j] = None
+    return doubles
+
+
+def reference_max_flow(board, taken=None):
+    # Most cell-disjoint top-to-bottom routes through non-'E' cells, with `taken` counted as an 'E':
+    # augmenting paths on the graph with every cell split into an in and an out node joined by a
+    # unit edge
+    size = len(board)
+    cells = [(i, j) for i in range(size) for j in range(size) if board[i][j] != 'E' and (i, j) != taken]
+    residual = {}
+    edges = {}
+
+    def link(a, b, capacity):
+        residual[a, b] = residual.get((a, b), 0) + capacity
+        residual.setdefault((b, a), 0)
+        edges.setdefault(a, []).append(b)
+        edges.setdefault(b, []).append(a)
+
+    unbounded = len(cells) + 1
+    for i, j in cells:
+        link(('in', i, j), ('out', i, j), 1)
+        if i == 0:
+            link('source', ('in', i, j), unbounded)
+        if i == size - 1:
+            link(('out', i, j), 'sink', unbounded)
+        for di, dj in NEIGHBOURS:
+            if (i + di, j + dj) in cells:
+                link(('out', i, j), ('in', i + di, j + dj), unbounded)
+    flow = 0
+    while True:
+        parent = {'source': None}
+        queue = ['source']
+        for node in queue:
+            for step in edges.get(node, ()):
+                if step not in parent and residual[node, step] > 0:
+                    parent[step] = node
+                    queue.append(step)
+        if 'sink' not in parent:
+            return flow
+        node = 'sink'
+        while parent[node] is not None:
+            residual[parent[node], node] -= 1
+            residual[node, parent[node]] += 1
+            node = parent[node]
+        flow += 1
+
+
+def reference_cut_cells(board):
+    # Cells whose taking lowers the max-flow, i.e. cells on some minimum cut, by removing each one
+    size = len(board)
+    flow = reference_max_flow(board)
+    return [(i, j) for i in range(size) for j in range(size)
+            if board[i][j] != 'E' and reference_max_flow(board, (i, j)) == flow - 1]
+
+
+def observe(state):
+    return (state.board, state.get_legal_moves(), state.check_passer_win(), state.check_eater_win(),
+            state.find_passer_path(), state.zobrist_key(), state.canonical_key(), state.current_player,
+            state.eater_turn_count)
+
+
+def play(rng, size, max_moves, undo_rate):
+    # One random game on every backend; returns (positions checked, first mismatch or None)
+    states = {name: backend(size) for name, backend in BACKENDS.items()}
+    board = [[None] * size for _ in range(size)]
+    eater_turns = 0
+    history = []
+    player = 'P'
+    checked = 0
+    for step in range(max_moves):
+        for state in states.values():
+            state.current_player = player
+        expected_moves = reference_legal_moves(board, player, eater_turns)
+        if not expected_moves:
+            break
+        move = rng.choice(expected_moves)
+        probe = (rng.randrange(-1, size + 1), rng.randrange(-1, size + 1))
+        for name, state in states.items():
+            if state.get_legal_moves() != expected_moves or state.is_legal(probe) != (probe in expected_moves):
+                return checked, f"{name}: legal moves differ at step {step}"
+            state.make_move(move, player)
+
+        i, j = move
+        history.append((i, j, board[i][j], eater_turns, player))
+        board[i][j] = player
+        if player == 'E':
+            eater_turns += 1
+
+        if rng.random() < undo_rate:
+            for state in states.values():
+                state.unmake_move()
+            i, j, board[i][j], eater_turns, player = history.pop()
+            continue
+
+        passer_wins, eater_wins = reference_passer_win(board), reference_eater_win(board)
+        winning_moves = reference_eater_winning_moves(board, eater_turns)
+        threats = None if passer_wins else reference_passer_threats(board)  # Undefined once the Passer has won
+        doubles = reference_double_threats(board) if size <= 5 and not passer_wins else None  # Quadratic in the cells
+        cuts = reference_cut_cells(board) if size <= 5 else None  # One max-flow per cell
+        observed = {name: observe(state) for name, state in states.items()}
+        first = next(iter(observed.values()))
+        for name, state in states.items():
+            seen = observed[name]
+            if seen[0] != board:
+                return checked, f"{name}: board differs after {move} at step {step}"
+            if seen[2] != passer_wins or seen[3] != eater_wins:
+                return checked, f"{name}: win checks {seen[2:4]} != reference {(passer_wins, eater_wins)} at step {step}"
+            if state.cell_hash != board_hash(board, size):
+                return checked, f"{name}: incremental hash differs at step {step}"
+            mirrored = [row[::-1] for row in board]
+            if state.mirror_hash != board_hash(mirrored, size) or state.is_mirror_symmetric() != (board == mirrored):
+                return checked, f"{name}: mirror hash differs at step {step}"
+            if seen != first:
+                return checked, f"{name}: disagrees with the other backends at step {step}"
+            if list(state.eater_winning_moves()) != winning_moves:
+                return checked, f"{name}: Eater winning moves differ at step {step}"
+            if threats is not None and list(state.passer_threats()) != threats:
+                return checked, f"{name}: Passer threats differ at step {step}"
+            if doubles is not None and list(state.passer_double_threats()) != doubles:
+                return checked, f"{name}: Passer double threats differ at step {step}"
+            if cuts is not None and [divmod(k, size) for k, rank in enumerate(state.cut_ranking()) if rank == 2] != cuts:
+                return checked, f"{name}: cut ranking differs from brute-force max-flow at step {step}"
+        checked += 1
+        if passer_wins or eater_wins:
+            break
+        player = 'E' if player == 'P' else 'P'
+    return checked, None
+
+
+def run_games(games, sizes, seed, undo_rate):
+    # Returns (positions checked, failure message or None)
+    rng = random.Random(seed)
+    checked = 0
+    for game in range(games):
+        size = rng.choice(sizes)
+        positions, failure = play(rng, size, size * size * 2, undo_rate)
+        checked += positions
+        if failure:
+            return checked, f"game {game} (seed {seed}, size {size}): {failure}"
+    return checked, None
+
+
+def run(games, sizes, seed, undo_rate, workers):
+    # Each worker plays its share of the games from its own seed (seed, seed + 1, ...)
+    shares = [(games // workers + (k < games % workers), sizes, seed + k, undo_rate) for k in range(workers)]
+    with Pool(workers) as pool:
+        results = pool.starmap(run_games, shares)
+    failures = [failure for _, failure in results if failure]
+    for failure in failures:
+        print(failure)
+    if not failures:
+        checked = sum(positions for positions, _ in results)
+        print(f"{games} games, {checked} positions, backends {', '.join(BACKENDS)}: all agree with the reference rules")
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Differential conformance run across rules backends")
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 4, 5, 9])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--undo-rate", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.games, args.sizes, args.seed, args.undo_rate, args.workers) else 1)
@@ -0,0 +1,394 @@
+# Incrementally maintained connectivity structures used by GameState to answer win checks
+# without searching the whole board after every move.
+
+from itertools import compress
+
+NEIGHBOURS = [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)]  # down, left, right, down-left, down-right
+ADJACENT = NEIGHBOURS + [(-1, 0), (-1, 1), (-1, -1)]  # the rule's neighbours in either direction
+
+# Bitmask helpers: cell (i, j) is bit i * size + j
+_GEOMETRY = {}
+
+
+class Geometry:
+    # Masks that only depend on the board size, shared by every state of that size
+    def __init__(self, size):
+        self.size = size
+        self.cells = size * size
+        self.full = (1 << self.cells) - 1
+        self.row_masks = [((1 << size) - 1) << (i * size) for i in range(size)]
+        self.top = self.row_masks[0]
+        self.bottom = self.row_masks[-1]
+        first_col = sum(1 << (i * size) for i in range(size))
+        self.col_masks = [first_col << j for j in range(size)]
+        self.not_first_col = self.full & ~first_col
+        self.not_last_col = self.full & ~(first_col << (size - 1))
+        self.coords = [(k // size, k % size) for k in range(self.cells)]
+        # Per cell, the cells one move can come from: above, the left and right neighbours, and the
+        # two upper diagonals (the reverse of NEIGHBOURS)
+        self.predecessors = [[(i - di) * size + j - dj for di, dj in NEIGHBOURS
+                              if 0 <= i - di < size and 0 <= j - dj < size]
+                             for i, j in self.coords]
+        self.successors = [[(i + di) * size + j + dj for di, dj in NEIGHBOURS
+                            if 0 <= i + di < size and 0 <= j + dj < size]
+                           for i, j in self.coords]
+
+
+def get_geometry(size):
+    geometry = _GEOMETRY.get(size)
+    if geometry is None:
+        geometry = _GEOMETRY[size] = Geometry(size)
+    return geometry
+
+
+def expand(mask, geometry):
+    # One step along every allowed direction: down, left, right, down-left, down-right
+    n = geometry.size
+    return ((mask << n)
+            | ((mask >> 1) & geometry.not_last_col)
+            | ((mask << 1) & geometry.not_first_col)
+            | ((mask << (n - 1)) & geometry.not_last_col)
+            | ((mask << (n + 1)) & geometry.not_first_col)) & geometry.full
+
+
+def expand_back(mask, geometry):
+    # The reverse step: every cell one move can come from into `mask`
+    n = geometry.size
+    return ((mask >> n)
+            | ((mask << 1) & geometry.not_first_col)
+            | ((mask >> 1) & geometry.not_last_col)
+            | ((mask >> (n - 1)) & geometry.not_first_col)
+            | ((mask >> (n + 1)) & geometry.not_last_col))
+
+
+def flood(seed, allowed, geometry, step=expand):
+    # All cells of `allowed` reachable from `seed` using the directed neighbour rule (backwards with
+    # step=expand_back)
+    reach = seed & allowed
+    while True:
+        grown = reach | (step(reach, geometry) & allowed)
+        if grown == reach:
+            return reach
+        reach = grown
+
+
+def iter_cells(mask, geometry):
+    # Yields (i, j) for every set bit, in row-major order
+    coords = geometry.coords
+    while mask:
+        low = mask & -mask
+        yield coords[low.bit_length() - 1]
+        mask ^= low
+
+
+def cut_cells(open_cells, geometry):
+    # Cells of open_cells that lie on every top-to-bottom path through open_cells under the move
+    # rule, i.e. the bottom's dominators, found by the iterative dataflow fixpoint over bitmask sets
+    # in one sweep or a few (left/right moves feed back within a row). All of open_cells when no path
+    # exists, since then taking any of them leaves none.
+    size, full = geometry.size, geometry.full
+    reach = flood(open_cells & geometry.top, open_cells, geometry)
+    if not reach & geometry.bottom:
+        return open_cells
+    order = [k for k in range(geometry.cells) if reach >> k & 1]
+    predecessors = geometry.predecessors
+    dom = [full] * geometry.cells  # dom[k]: cells on every path from the top row to k
+    changed = True
+    while changed:
+        changed = False
+        for k in order:
+            if k < size:  # Entered straight from the top edge
+                cell_dom = 1 << k
+            else:
+                cell_dom = full
+                for p in predecessors[k]:
+                    if reach >> p & 1:
+                        cell_dom &= dom[p]
+                cell_dom |= 1 << k
+            if cell_dom != dom[k]:
+                dom[k] = cell_dom
+                changed = True
+    cut = full
+    for k in order:
+        if k >= geometry.cells - size:  # Any reachable bottom cell ends a path
+            cut &= dom[k]
+    return cut
+
+
+def passer_ends(passer, geometry):
+    # (cells one Passer marker would join to the top row, cells it would join to the bottom row):
+    # a move away from the Passer cells connected to the top, or in the top row, and a move before
+    # the Passer cells connected to the bottom, or in the bottom row
+    from_top = flood(passer & geometry.top, passer, geometry)
+    to_bottom = flood(passer & geometry.bottom, passer, geometry, expand_back)
+    return expand(from_top, geometry) | geometry.top, expand_back(to_bottom, geometry) | geometry.bottom
+
+
+def rows_with(mask, geometry):
+    return sum(1 for row in geometry.row_masks if mask & row)
+
+
+def threat_cells(passer, empty, geometry):
+    # Empty cells where one more Passer marker completes a top-to-bottom Passer path. That needs a
+    # Passer cell in every row but one already, which rules most positions out before any flood.
+    if rows_with(passer, geometry) < geometry.size - 1:
+        return 0
+    joins_top, joins_bottom = passer_ends(passer, geometry)
+    return empty & joins_top & joins_bottom
+
+
+def double_threat_cells(passer, empty, geometry):
+    # Empty cells that don't win yet but leave at least two threat cells behind a Passer marker, so
+    # one Eater marker on an empty cell can't stop the next move from winning. Only cells joining
+    # the top- or bottom-connected Passer cells can change the threats, so only those get a pass
+    # of their own; elsewhere the threats stay as they are.
+    if rows_with(passer, geometry) < geometry.size - 2:
+        return 0
+    joins_top, joins_bottom = passer_ends(passer, geometry)
+    threats = empty & joins_top & joins_bottom
+    joining = empty & ~threats & (joins_top | joins_bottom)
+    doubles = empty & ~threats & ~joining if threats.bit_count() >= 2 else 0
+    while joining:
+        cell = joining & -joining
+        joining ^= cell
+        if threat_cells(passer | cell, empty & ~cell, geometry).bit_count() >= 2:
+            doubles |= cell
+    return doubles
+
+
+_DIGITS = bytes.maketrans(b'01', b'\0\1')
+
+
+def cells_tuple(mask, geometry):
+    # The cells of iter_cells as a tuple; compress() over the binary digits is several times faster
+    return tuple(compress(geometry.coords, bin(mask)[:1:-1].encode().translate(_DIGITS)))
+
+
+class PasserUnionFind:
+    # Disjoint sets over Passer cells plus virtual TOP and BOTTOM nodes. Cells are joined with
+    # every Passer neighbour under the move rule, in either direction, so TOP and BOTTOM fall into
+    # one set whenever a top-to-bottom Passer path might exist. When they don't, check_passer_win
+    # can answer False straight away; when they do, the exact (no upward moves) search confirms it.
+    __slots__ = ('size', 'top', 'bottom', 'parent', 'weight', 'journal')
+
+    def __init__(self, size):
+        self.size = size
+        self.top = size * size
+        self.bottom = size * size + 1
+        self.parent = list(range(size * size + 2))
+        self.weight = [1] * (size * size + 2)
+        self.journal = []  # Unions and rebuilds in order, so unmake_move can roll them back
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.weight[ra] < self.weight[rb]:  # Union by size keeps the trees shallow
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.weight[ra] += self.weight[rb]
+        self.journal.append((rb, ra))
+
+    def add(self, i, j, board):
+        # Join a newly placed Passer cell with its Passer neighbours and the virtual edge nodes
+        size = self.size
+        cell = i * size + j
+        if i == 0:
+            self.union(cell, self.top)
+        if i == size - 1:
+            self.union(cell, self.bottom)
+        for di, dj in ADJACENT:
+            ni, nj = i + di, j + dj
+            if 0 <= ni < size and 0 <= nj < size and board[ni][nj] == 'P':
+                self.union(cell, ni * size + nj)
+
+    def rebuild(self, board):
+        # Sets can't be split, so an Eater overwrite re-creates them from the board
+        self.journal.append((None, self.parent, self.weight))
+        self.parent = list(range(self.size * self.size + 2))
+        self.weight = [1] * (self.size * self.size + 2)
+        for i in range(self.size):
+            for j in range(self.size):
+                if board[i][j] == 'P':
+                    self.add(i, j, board)
+
+    def mark(self):
+        return len(self.journal)
+
+    def rollback(self, mark):
+        # Undo every union and rebuild made since mark() returned `mark`
+        journal = self.journal
+        while len(journal) > mark:
+            entry = journal.pop()
+            if entry[0] is None:
+                _, self.parent, self.weight = entry
+            else:
+                rb, ra = entry
+                self.parent[rb] = rb
+                self.weight[ra] -= self.weight[rb]
+
+    def spans(self):
+        return self.find(self.top) == self.find(self.bottom)
+
+    def copy(self):
+        new_sets = PasserUnionFind.__new__(PasserUnionFind)
+        new_sets.size = self.size
+        new_sets.top = self.top
+        new_sets.bottom = self.bottom
+        new_sets.parent = self.parent[:]
+        new_sets.weight = self.weight[:]
+        new_sets.journal = []
+        return new_sets
+
+
+class OpenReachability:
+    # Bitmask (cell (i, j) is bit i * size + j) of the non-Eater cells the Passer can still reach
+    # from the top row under the move rule. Eater markers only ever shrink it, and a new 'E' can only
+    # cut off cells downstream of where it lands, so that region is all settle() re-floods. Blocks
+    # are queued until the next query, so trial moves that are taken back never pay for a flood.
+    __slots__ = ('size', 'geometry', 'reach', 'pending')
+
+    def __init__(self, size):
+        self.size = size
+        self.geometry = get_geometry(size)
+        self.reach = self.geometry.full  # Empty board: every cell is reachable
+        self.pending = 0  # Reachable cells taken by the Eater since the last settle()
+
+    def block(self, i, j):
+        bit = 1 << (i * self.size + j)
+        if self.reach & bit:  # Cells already cut off have nothing downstream depending on them
+            self.pending |= bit
+
+    def settle(self):
+        geometry = self.geometry
+        others = self.reach & ~self.pending
+        downstream = flood(expand(self.pending, geometry), others, geometry)
+        kept = others & ~downstream  # Not downstream of a blocked cell, so still reachable
+        seeds = downstream & (expand(kept, geometry) | geometry.top)
+        self.reach = kept | flood(seeds, downstream, geometry)
+        self.pending = 0
+
+    def blocked(self):
+        if self.pending:
+            self.settle()
+        return not self.reach & self.geometry.bottom
+
+    def mark(self):
+        return self.reach, self.pending
+
+    def rollback(self, mark):
+        self.reach, self.pending = mark
+
+    def copy(self):
+        new_reach = OpenReachability.__new__(OpenReachability)
+        new_reach.size = self.size
+        new_reach.geometry = self.geometry
+        new_reach.reach = self.reach
+        new_reach.pending = self.pending
+        return new_reach
+
+
+class PasserChain:
+    # Deepest Passer chain reachable from the top row, by dynamic programming one row at a time:
+    # a row's shortest chain lengths only depend on the row above plus left/right moves inside the
+    # row, so the whole board takes one pass and a move at row r only makes rows r and below stale.
+    __slots__ = ('size', 'rows', 'dirty', 'chain')
+
+    def __init__(self, size):
+        self.size = size
+        self.rows = [None] * size  # Per row: (lengths, parents); lengths[j] is None when unreachable
+        self.dirty = 0  # First row whose entry is stale
+        self.chain = None  # Cells from the top row to the deepest one, cached until a row changes
+
+    def touch(self, i):
+        if i < self.dirty:
+            self.dirty = i
+
+    def refresh(self, board):
+        size = self.size
+        unreachable = (None,) * size
+        for i in range(self.dirty, size):
+            row = board[i]
+            if 'P' not in row or (i > 0 and self.rows[i - 1][0] == unreachable):
+                # Nothing reaches this row, so nothing reaches the rows below either
+                for k in range(i, size):
+                    self.rows[k] = (unreachable, unreachable)
+                break
+            length = [None] * size
+            parent = [None] * size
+            if i == 0:
+                for j in range(size):
+                    if row[j] == 'P':
+                        length[j] = 1
+            else:
+                above = self.rows[i - 1][0]
+                for j in range(size):
+                    if row[j] != 'P':
+                        continue
+                    for pj in (j, j - 1, j + 1):  # Entered by a down, down-right or down-left move
+                        if 0 <= pj < size and above[pj] is not None and (length[j] is None or above[pj] + 1 < length[j]):
+                            length[j] = above[pj] + 1
+                            parent[j] = (i - 1, pj)
+            # Left and right moves along runs of Passer cells; one sweep each way settles a line
+            for j in range(1, size):
+                if row[j] == 'P' and length[j - 1] is not None and (length[j] is None or length[j - 1] + 1 < length[j]):
+                    length[j] = length[j - 1] + 1
+                    parent[j] = (i, j - 1)
+            for j in range(size - 2, -1, -1):
+                if row[j] == 'P' and length[j + 1] is not None and (length[j] is None or length[j + 1] + 1 < length[j]):
+                    length[j] = length[j + 1] + 1
+                    parent[j] = (i, j + 1)
+            self.rows[i] = (tuple(length), tuple(parent))
+        self.dirty = size
+        self.chain = None
+
+    def path(self, board):
+        # Returns (path, end) like the old backtracking search: the chain from the top row to its
+        # deepest cell, followed by the frontier cell it would extend into next (end)
+        if self.dirty < self.size:
+            self.refresh(board)
+        if self.chain is None:
+            self.chain = self.deepest_chain()
+        if not self.chain:
+            return [], None
+
+        size = self.size
+        i, j = self.chain[-1]
+        end = (i + 1, j)
+        for nj in (j, j - 1, j + 1):  # Prefer a frontier cell the Eater hasn't taken
+            if i + 1 < size and 0 <= nj < size and board[i + 1][nj] != 'E':
+                end = (i + 1, nj)
+                break
+        return list(self.chain) + [end], end
+
+    def deepest_chain(self):
+        # Deepest reachable cell (longest chain on ties) traced back to the top row
+        size = self.size
+        deepest = None
+        for i in range(size - 1, -1, -1):
+            length = self.rows[i][0]
+            for j in range(size):
+                if length[j] is not None and (deepest is None or length[j] > length[deepest[1]]):
+                    deepest = (i, j)
+            if deepest is not None:
+                break
+        chain = []
+        cell = deepest
+        while cell is not None:
+            chain.append(cell)
+            cell = self.rows[cell[0]][1][cell[1]]
+        return tuple(reversed(chain))
+
+    def copy(self):
+        new_chain = PasserChain.__new__(PasserChain)
+        new_chain.size = self.size
+        new_chain.rows = self.rows[:]
+        new_chain.dirty = self.dirty
+        new_chain.chain = self.chain
+        return new_chain
@@ -1,98 +1,5 @@
 import random
-
-class GameState:
-    def __init__(self, size):
-        self.size = size
-        self.board = [[None for _ in range(size)] for _ in range(size)]
-        self.current_player = 'P'
-        self.eater_turn_count = 0
-        self.passer_win_cache = None
-        self.eater_win_cache = None
-        self.last_move = None
-        self.passer_last_move = None
-
-
-    # Get list of legal moves for the current player
-    def get_legal_moves(self):
-        if self.current_player == 'P':
-            # Passer can only move to empty cells
-            return [(i, j) for i in range(self.size) for j in range(self.size) if self.board[i][j] is None]
-        else:
-            # Eater can overwrite every third turn
-            if self.eater_turn_count % 3 == 2:
-                return [(i, j) for i in range(self.size) for j in range(self.size)]
-            else:
-                return [(i, j) for i in range(self.size) for j in range(self.size) if self.board[i][j] is None]
-
-    def make_move(self, move, player):    # Apply a move to the board
-        i, j = move
-        self.last_move = (move, player)
-        self.passer_win_cache = None
-        self.eater_win_cache = None
-        if player == 'E':
-            self.board[i][j] = 'E'
-            self.eater_turn_count += 1
-        elif player == 'P' and self.board[i][j] is None:
-            self.board[i][j] = 'P'
-            self.passer_last_move = (i, j)
-
-    def check_passer_win(self):  # Check if Passer has connected top to bottom
-        if self.passer_win_cache is not None:
-            return self.passer_win_cache
-
-        visited = set()
-        def dfs(i, j):
-            if (i, j) in visited or i < 0 or i >= self.size or j < 0 or j >= self.size or self.board[i][j] != 'P':
-                return False
-            if i == self.size - 1:
-                return True
-            visited.add((i, j))
-            return any(dfs(i + di, j + dj) for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)])
-
-        passer_wins = any(dfs(0, j) for j in range(self.size) if self.board[0][j] == 'P')
-        self.passer_win_cache = passer_wins
-        return self.passer_win_cache
-
-    def check_eater_win(self):  # Check if Eater has won (either a full row or Passer can't win anymore)
-        if self.eater_win_cache is not None:
-            return self.eater_win_cache
-
-        # Check for any full row
-        for i in range(self.size):
-            if all(self.board[i][j] == 'E' for j in range(self.size)):
-                self.eater_win_cache = True
-                return True
-
-        visited = set()
-        def dfs(i, j):
-            if i == self.size - 1:
-                return True
-            if (i, j) in visited or i < 0 or i >= self.size or j < 0 or j >= self.size or self.board[i][j] == 'E':
-                return False
-            visited.add((i, j))
-            return any(dfs(i + di, j + dj) for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)])
-
-        # Eater wins if Passer cannot reach the bottom
-        can_passer_win = any(dfs(0, j) for j in range(self.size) if self.board[0][j] != 'E')
-        self.eater_win_cache = not can_passer_win
-        return self.eater_win_cache
-
-    def display(self):
-        print('   ', ' '.join(str(i + 1) for i in range(self.size)))
-        for i in range(self.size):
-            row = [self.board[i][j] if self.board[i][j] else '|' for j in range(self.size)]
-            print(f'{i + 1:2} ', ' '.join(row))
-
-    def copy(self):  # Create a deep copy of the current game state
-        new_state = GameState(self.size)
-        new_state.board = [row[:] for row in self.board]
-        new_state.current_player = self.current_player
-        new_state.eater_turn_count = self.eater_turn_count
-        new_state.passer_win_cache = self.passer_win_cache
-        new_state.eater_win_cache = self.eater_win_cache
-        new_state.last_move = self.last_move
-        new_state.passer_last_move = self.passer_last_move
-        return new_state
+from rules import new_state
 
 def cpu_move_easy(game):
     print("Eater is thinking...")
@@ -105,12 +12,14 @@ def cpu_move_easy(game):
     if not legal_moves:
         return None
 
-    # Overwrite any random Passer move if allowed
+    # Overwrite a Passer marker if allowed: one of those whose loss cuts the most top-to-bottom routes
     if overwrite_allowed:
         passer_cells = [(r, c) for r in range(size) for c in range(size) if board[r][c] == 'P']
         if passer_cells:
-            move = random.choice(passer_cells)
-            print("Eater is overwriting a random Passer marker!")
+            ranking = game.cut_ranking()
+            best = max(ranking[r * size + c] for r, c in passer_cells)
+            move = random.choice([(r, c) for r, c in passer_cells if ranking[r * size + c] == best])
+            print("Eater is overwriting a Passer marker!")
             return move
 
     # Smarter blocking logic
@@ -120,7 +29,7 @@ def cpu_move_easy(game):
             if board[r][c] == 'P':
                 for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
                     nr, nc = r + dr, c + dc
-                    if 0 <= nr < size and 0 <= nc < size and (nr, nc) in legal_moves:
+                    if game.is_legal((nr, nc)):
                         score = nr
                         nearby = sum(
                             1 for ddr, ddc in [(-1, 0), (1, 0), (0, -1), (0, 1)]
@@ -137,8 +46,8 @@ def cpu_move_easy(game):
     print(f"Eater plays at {move[0] + 1} {move[1] + 1}")
     return move
 
-def play_game(size):
-    game = GameState(size)
+def play_game(size, backend="list"):
+    game = new_state(size, backend)
     print("Welcome to the Eater game! You are the Passer (P). Connect the top to the bottom with your markers.")
     print("The CPU is the Eater (E) in easy mode. It wins by making it impossible for you to connect.")
     print("Eater may play next to your markers or randomly on the board.")
@@ -158,7 +67,7 @@ def play_game(size):
                         return
                     row, col = map(int, user_input.split())
                     move = (row - 1, col - 1)
-                    if move in game.get_legal_moves():
+                    if game.is_legal(move):
                         break
                     else:
                         print("Invalid move! Try again.")
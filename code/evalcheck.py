@@ -0,0 +1,104 @@
+import argparse
+import random
+import sys
+
+from connectivity import NEIGHBOURS, PasserChain
+from medium import MiniMaxPlayer
+from rules import BACKENDS
+
+# Checks MiniMaxPlayer.evaluate_board, which reads counters the states maintain incrementally, against
+# the original from-scratch evaluation on random positions (random take-backs included) for every
+# backend. Run from the code folder:
+#   python evalcheck.py --games 5000
+
+
+def reference_evaluate(board):
+    # The evaluation as it was before the counters: every term rebuilt from the board
+    size = len(board)
+    row_scores = 0
+    for i in range(size):
+        eater_count = sum(1 for j in range(size) if board[i][j] == 'E')
+        if eater_count == size:
+            return 900
+        row_scores += (eater_count * eater_count) / size
+
+    path, end = PasserChain(size).path(board)
+    path_length = len(path) if path else 0
+    path_progress = 0
+    if path and end and end[0] >= 0 and end[0] < size:
+        path_progress = end[0] / (size - 1)
+
+    connectivity = 0
+    for i in range(size):
+        for j in range(size):
+            if board[i][j] == 'P':
+                for di, dj in NEIGHBOURS:
+                    ni, nj = i + di, j + dj
+                    if 0 <= ni < size and 0 <= nj < size and board[ni][nj] == 'P':
+                        connectivity += 1
+
+    blockage = 0
+    for i in range(size // 3, 2 * size // 3 + 1):
+        blockage += sum(1 for j in range(size) if board[i][j] == 'E') * 5
+    blockage += sum(5 for i in range(size) if board[i][size // 2] == 'E')
+
+    eater_score = row_scores + blockage
+    passer_score = path_length * 10 + path_progress * 50 + connectivity * 15
+    return eater_score - passer_score
+
+
+def play(rng, player, size, undo_rate):
+    # One random game on every backend; returns (positions checked, first mismatch or None)
+    states = {name: backend(size) for name, backend in BACKENDS.items()}
+    reference = states['list']
+    side = 'P'
+    checked = 0
+    for step in range(size * size * 2):
+        for state in states.values():
+            state.current_player = side
+        legal_moves = reference.get_legal_moves()
+        if not legal_moves:
+            break
+        move = rng.choice(legal_moves)
+        for state in states.values():
+            state.make_move(move, side)
+        if rng.random() < undo_rate:
+            for state in states.values():
+                state.unmake_move()
+            continue
+
+        expected = reference_evaluate(reference.board)
+        for name, state in states.items():
+            score = player.evaluate_board(state)
+            if score != expected:
+                return checked, f"{name}: evaluate_board {score} != from-scratch {expected} at step {step}"
+        checked += 1
+        if reference.check_passer_win() or reference.check_eater_win():
+            break
+        side = 'E' if side == 'P' else 'P'
+    return checked, None
+
+
+def run(games, sizes, seed, undo_rate):
+    rng = random.Random(seed)
+    player = MiniMaxPlayer()
+    checked = 0
+    for game in range(games):
+        size = rng.choice(sizes)
+        positions, failure = play(rng, player, size, undo_rate)
+        checked += positions
+        if failure:
+            print(f"game {game} (seed {seed}, size {size}): {failure}")
+            return False
+    print(f"{games} games, {checked} positions, backends {', '.join(BACKENDS)}: evaluations match")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental evaluation against the from-scratch one")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 4, 5, 9])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--undo-rate", type=float, default=0.2)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.games, args.sizes, args.seed, args.undo_rate) else 1)
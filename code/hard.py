@@ -1,237 +1,257 @@
+import atexit
 import random
 import math
-
-class GameState:
-    def __init__(self, size):
-        self.size = size
-        self.board = [[None for _ in range(size)] for _ in range(size)]  # None: empty, 'P': Passer, 'E': Eater
-        self.current_player = 'P'  # Passer starts
-        self.eater_turn_count = 0  # Track Eater's turns for overwrite restriction
-        self.passer_win_cache = None  # Cache for Passer win condition
-        self.eater_win_cache = None  # Cache for Eater win condition
-        self.last_move = None  # Track last move to invalidate cache
-        self.passer_last_move = None  # Track Passer's last move
-
-    def get_legal_moves(self):
-        if self.current_player == 'P':
-            return [(i, j) for i in range(self.size) for j in range(self.size) if self.board[i][j] is None]
-        else:  # Eater
-            if self.eater_turn_count % 3 == 2:  # Overwrite allowed every 3 turns (turns 3, 6, 9, ...)
-                return [(i, j) for i in range(self.size) for j in range(self.size)]
-            else:  # Other turns: must place in empty cell
-                return [(i, j) for i in range(self.size) for j in range(self.size) if self.board[i][j] is None]
-
-    def make_move(self, move, player):
-        i, j = move
-        self.last_move = (move, player)  # Invalidate cache on move
-        self.passer_win_cache = None
-        self.eater_win_cache = None
-        if player == 'E':
-            self.board[i][j] = 'E'
-            self.eater_turn_count += 1
-        elif player == 'P' and self.board[i][j] is None:
-            self.board[i][j] = 'P'
-            self.passer_last_move = (i, j)  # Update Passer's last move
-
-    def check_passer_win(self):
-        if self.passer_win_cache is not None:
-            return self.passer_win_cache
-
-        visited = set()
-        def dfs(i, j):
-            if i == self.size - 1 and self.board[i][j] == 'P':  # Reached bottom row with a 'P'
-                return True
-            if (i, j) in visited or i < 0 or i >= self.size or j < 0 or j >= self.size or self.board[i][j] != 'P':
-                return False
-            visited.add((i, j))
-            return any(dfs(i + di, j + dj) for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)])
-
-        passer_wins = any(dfs(0, j) for j in range(self.size) if self.board[0][j] == 'P')
-        self.passer_win_cache = passer_wins
-        return self.passer_win_cache
-
-    def check_eater_win(self):
-        if self.eater_win_cache is not None:
-            return self.eater_win_cache
-
-        for i in range(self.size):
-            if all(self.board[i][j] == 'E' for j in range(self.size)): #checks if eater has occupied an entire row
-                self.eater_win_cache = True
-                return True
-
-        visited = set()
-        def dfs(i, j): # Uses DFS to check if the Passer can form a path from the top row to the bottom row using 'P' or empty cells (None).
-            if i == self.size - 1:
-                return True
-            if (i, j) in visited or i < 0 or i >= self.size or j < 0 or j >= self.size or self.board[i][j] == 'E':
-                return False
-            visited.add((i, j))
-            return any(dfs(i + di, j + dj) for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)])
-
-        can_passer_win = any(dfs(0, j) for j in range(self.size) if self.board[0][j] != 'E')
-        self.eater_win_cache = not can_passer_win #The Eater wins if no such path exists (not can_passer_win).
-        return self.eater_win_cache
-
-    def find_passer_path(self): #finds the longest path the passer has made (used by the eater to prioritize blocking moves & used in the MCTS sim)
-        best_path = []
-        best_length = 0
-        best_end = None
-
-        for start_col in range(self.size):
-            if self.board[0][start_col] != 'P':
-                continue
-            visited = set()
-            path = [(0, start_col)]
-            def dfs(i, j):
-                nonlocal path, best_path, best_length, best_end
-                if (i, j) in visited or i < 0 or i >= self.size or j < 0 or j >= self.size or self.board[i][j] != 'P':
-                    if len(path) > best_length:
-                        best_length = len(path)
-                        best_path = path[:]
-                        best_end = (i, j)
-                    return
-                visited.add((i, j))
-                for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)]:
-                    path.append((i + di, j + dj))
-                    dfs(i + di, j + dj)
-                    path.pop()
-
-            dfs(0, start_col)
-
-        return best_path, best_end
-
-    def display(self):
-        print('   ', ' '.join(str(i + 1) for i in range(self.size)))
-        for i in range(self.size):
-            row = [self.board[i][j] if self.board[i][j] else '|' for j in range(self.size)]
-            print(f'{i + 1:2} ', ' '.join(row))
-
-    def get_passer_last_move(self):
-        return self.passer_last_move
-
-    def copy(self): #Creates deep copy of the curr game state. Used in MCTS to simulate moves without modifying the actual game state.
-        new_state = GameState(self.size)
-        new_state.board = [row[:] for row in self.board]
-        new_state.current_player = self.current_player
-        new_state.eater_turn_count = self.eater_turn_count
-        new_state.passer_win_cache = self.passer_win_cache
-        new_state.eater_win_cache = self.eater_win_cache
-        new_state.last_move = self.last_move
-        new_state.passer_last_move = self.passer_last_move
-        return new_state
+import time
+import multiprocessing
+try:
+    import numpy as np
+    from batchrollouts import BatchRollouts, deepest, flood
+except ImportError: #Eater moves in rollouts are then scored in a plain loop, see MCTS._best_eater_move, and rollouts can't be batched.
+    np = None
+    BatchRollouts = None
+from connectivity import iter_cells
+from rules import new_state, drop_mirror_moves
+from pns import solve_endgame, SOLVE_BELOW
+from book import book_move
 
 class MCTSNode:
-    def __init__(self, state, move=None, parent=None):
-        self.state = state
-        self.move = move
-        self.parent = parent
-        self.children = []
+    __slots__ = ('moves', 'children', 'wins', 'visits')
+
+    def __init__(self, state): #Nodes hold no board and not even their own move: children[k] is reached by moves[k], and MCTS replays moves on one working state.
+        self.children = None  # Created on first expansion; most nodes stay leaves
         self.wins = 0
         self.visits = 0
-        self.untried_moves = self.get_priority_moves()
+        if state.check_passer_win() or state.check_eater_win():
+            self.moves = ()  # Terminal: nothing to expand
+        else:
+            self.moves = None  # Filled in from get_priority_moves when the node is first expanded
 
-    def get_priority_moves(self): #elects a prioritized subset of legal moves for MCTS to explore, improving efficiency.
-        legal_moves = self.state.get_legal_moves()
+    def get_priority_moves(self, state): #elects a prioritized subset of legal moves for MCTS to explore, improving efficiency.
+        legal_moves = state.legal_moves_view()
         if not legal_moves:
             return [] #Returns an empty list if there are no legal moves.
 
         priority_moves = []
-        if self.state.current_player == 'E' and self.state.eater_turn_count % 3 == 2: #Priority 1: Overwrite Passer’s Last Move (if allowed)
-            last_passer_move = self.state.get_passer_last_move()
-            if last_passer_move and last_passer_move in legal_moves:
-                priority_moves.append(last_passer_move)
-
-        path, end = self.state.find_passer_path() #Priority 2: Block Passer’s Path
-        if end and end[0] < self.state.size and end[1] < self.state.size:
-            if (end[0], end[1]) in legal_moves:
+        ranking = state.cut_ranking() if state.current_player == 'E' else None
+        if state.current_player == 'E' and state.eater_turn_count % 3 == 2: #Priority 1: Overwrite the Passer marker whose loss cuts the most routes (if allowed), the last one placed on ties
+            last_passer_move = state.get_passer_last_move()
+            passer_cells = [(i, j) for i, j in legal_moves if state.board[i][j] == 'P']
+            if passer_cells:
+                priority_moves.append(max(passer_cells, key=lambda move: (ranking[move[0] * state.size + move[1]], move == last_passer_move)))
+
+        path, end = state.find_passer_path() #Priority 2: Block Passer’s Path
+        if end and end[0] < state.size and end[1] < state.size:
+            if state.is_legal(end):
                 priority_moves.append((end[0], end[1]))
             else:
                 for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)]:
                     ni, nj = end[0] + di, end[1] + dj
-                    if 0 <= ni < self.state.size and 0 <= nj < self.state.size and (ni, nj) in legal_moves:
+                    if state.is_legal((ni, nj)):
                         priority_moves.append((ni, nj))
                         break
 
+        if ranking is not None and 2 in ranking: #Priority 2b: A cell on a minimum cut of the Passer's routes, nearest the Passer's last move
+            last_i, last_j = state.get_passer_last_move() or (0, state.size // 2)
+            cut_moves = [(i, j) for i, j in legal_moves if ranking[i * state.size + j] == 2]
+            if cut_moves:
+                priority_moves.append(min(cut_moves, key=lambda move: abs(move[0] - last_i) + abs(move[1] - last_j)))
+
         # Priority 3: Predictive blocking - moves near Passer's last move
-        if self.state.current_player == 'E' and self.state.get_passer_last_move():
-            last_i, last_j = self.state.get_passer_last_move()
+        if state.current_player == 'E' and state.get_passer_last_move():
+            last_i, last_j = state.get_passer_last_move()
             for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)]:
                 ni, nj = last_i + di, last_j + dj
-                if 0 <= ni < self.state.size and 0 <= nj < self.state.size and (ni, nj) in legal_moves:
+                if state.is_legal((ni, nj)):
                     priority_moves.append((ni, nj))
 
-        row_counts = [sum(1 for j in range(self.state.size) if self.state.board[i][j] == 'E') for i in range(self.state.size)] #Priority 4: Places an 'E' in the row with the most 'E' markers to work toward filling a row.
+        row_counts = [sum(1 for j in range(state.size) if state.board[i][j] == 'E') for i in range(state.size)] #Priority 4: Places an 'E' in the row with the most 'E' markers to work toward filling a row.
         max_row = row_counts.index(max(row_counts))
-        row_moves = [(max_row, j) for j in range(self.state.size) if (max_row, j) in legal_moves]
+        row_moves = [(max_row, j) for j in range(state.size) if state.is_legal((max_row, j))]
         if row_moves:
             priority_moves.append(row_moves[0])
 
         if len(row_counts) > 1:
             second_best_row = sorted(range(len(row_counts)), key=lambda i: row_counts[i], reverse=True)[1] #Priority 5: Places an 'E' in the row with the second-highest number of 'E' markers.
-            row_moves = [(second_best_row, j) for j in range(self.state.size) if (second_best_row, j) in legal_moves]
+            row_moves = [(second_best_row, j) for j in range(state.size) if state.is_legal((second_best_row, j))]
             if row_moves:
                 priority_moves.append(row_moves[0])
 
-        empty_moves = [(i, j) for i, j in legal_moves if self.state.board[i][j] is None]
+        empty_moves = [(i, j) for i, j in legal_moves if state.board[i][j] is None]
         if empty_moves:
             priority_moves.append(random.choice(empty_moves)) #Priority 6: Adds a random empty cell as a fallback.
 
         seen = set() #Removes duplicates using a set.
         priority_moves = [move for move in priority_moves if not (move in seen or seen.add(move))]
-        return priority_moves if priority_moves else legal_moves[:1] #Falls back to the first legal move if no priority moves are found.
+        return priority_moves if priority_moves else list(legal_moves[:1]) #Falls back to the first legal move if no priority moves are found.
 
     def is_fully_expanded(self): #Checks if all moves from this node have been explored.
-        return len(self.untried_moves) == 0
+        return self.moves is not None and len(self.children or ()) == len(self.moves)
 
-    def best_child(self, c_param=1.4): #Selects the best child node using the UCB1 formula.
+    def best_child(self, c_param=1.4): #Selects the best child using the UCB1 formula and returns its index in children/moves.
         choices_weights = [
             (child.wins / child.visits) + c_param * math.sqrt((2 * math.log(self.visits) / child.visits)) #
             for child in self.children
         ]
-        return self.children[choices_weights.index(max(choices_weights))]
+        return choices_weights.index(max(choices_weights))
 
 class MCTS:
-    def __init__(self, iterations=1000, max_depth=8):
+    # Anytime search: iterations caps the root's visits and time_budget (seconds) the wall clock; either
+    # may be None, not both. With reuse=True the tree outlives search(): the next search starts from
+    # the grandchild reached by the Eater move and the Passer reply actually played, keeping its visits
+    # and topping it up to the cap rather than running the full count again.
+    # With workers > 1 each worker process grows its own tree (root-parallel); reuse is serial-only.
+    def __init__(self, iterations=1000, max_depth=8, time_budget=None, reuse=False, workers=1, rollout_batch=None, keep_visits=100000):
+        if iterations is None and time_budget is None:
+            raise ValueError("MCTS needs an iteration cap, a time budget or both")
+        if rollout_batch and BatchRollouts is None:
+            raise ImportError("rollout_batch needs NumPy")
         self.iterations = iterations
         self.max_depth = max_depth
-
-    def search(self, state): #Runs MCTS to find the best move for the Eater.
-        root = MCTSNode(state) #Creates a root node for the current game state.
-        for _ in range(self.iterations): #performs iterations
-            node = self._select(root) #Selection: Chooses a node to explore (_select).
-            if not (node.state.check_passer_win() or node.state.check_eater_win()) and not node.is_fully_expanded():
-                node = self._expand(node)  #Expansion: If the node isn’t terminal and has untried moves, expands it (_expand)
-            reward = self._simulate(node.state) #Simulation: Simulates a random game from the node’s state (_simulate)
-            self._backpropagate(node, reward) #Backpropagation: Updates node statistics (_backpropagate)
-        best_child = max(root.children, key=lambda c: c.visits)
-        return best_child.move #Returns the move of the child node with the most visits.
-
-    def _select(self, node): #Moves to the best child (via best_child) until it reaches a terminal state or a node with untried moves.
-        while not (node.state.check_passer_win() or node.state.check_eater_win()) and node.is_fully_expanded():
-            node = node.best_child()
-        return node
-
-    def _expand(self, node): #xpands the node by trying an untried move.
-        move = node.untried_moves.pop(0) #Takes the first untried move.
-        new_state = node.state.copy() #Creates a copy of the state, applies the move, and switches the player.
-        new_state.make_move(move, new_state.current_player)
-        new_state.current_player = 'E' if new_state.current_player == 'P' else 'P'
-        child_node = MCTSNode(new_state, move, node) #Creates a new child node and returns it.
+        self.time_budget = time_budget
+        self.reuse = reuse
+        self.workers = workers
+        self.rollout_batch = rollout_batch  # Leaves scored by the mean of this many lockstep rollouts (batchrollouts) instead of one _simulate
+        self.batch = None  # BatchRollouts for the board size last searched
+        self.pool = None  # Started by the first parallel search, see close()
+        self.root_visits = {}  # Move -> visits summed over the workers' trees in the last parallel search
+        self.root_wins = {}
+        self.root = None  # Tree kept for the next search, and the position at its root
+        self.keep_visits = keep_visits  # Trees with more root visits than this aren't kept
+        self.root_state = None
+        self.carried = 0  # Root visits inherited from the previous search
+        self.iterations_run = 0  # Iterations the last search ran itself
+
+    def search(self, state, time_budget=None): #Runs MCTS to find the best move for the Eater.
+        if self.workers > 1:
+            return self.search_parallel(state, time_budget)
+        root = self._grow(state, time_budget)
+        if not root.children: #A finished game: nothing to play.
+            return None
+        best = max(range(len(root.children)), key=lambda k: root.children[k].visits)
+        return root.moves[best] #Returns the move of the child node with the most visits.
+
+    def search_parallel(self, state, time_budget=None): #One tree per worker, seeded from this process's random so runs repeat; returns the move with the most visits over all the trees.
+        if time_budget is None:
+            time_budget = self.time_budget
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers, initializer=_init_worker,
+                                             initargs=(self.iterations, self.max_depth, self.time_budget, self.rollout_batch))
+        root = state.copy()
+        tasks = [(root, random.randrange(2 ** 32), time_budget) for _ in range(self.workers)]
+        self.root_visits, self.root_wins = {}, {}
+        for moves, visits, wins in self.pool.starmap(_grow_root, tasks): #Counts are merged per move, as root moves can differ between trees.
+            for move, child_visits, child_wins in zip(moves, visits, wins):
+                self.root_visits[move] = self.root_visits.get(move, 0) + child_visits
+                self.root_wins[move] = self.root_wins.get(move, 0) + child_wins
+        if not self.root_visits:
+            return None
+        return max(self.root_visits, key=self.root_visits.get)
+
+    def close(self): #Shuts down the worker pool of a parallel search and drops the kept tree.
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+        self.root = self.root_state = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _reused_root(self, state): #The kept tree's grandchild whose position is `state`, or None; found by replaying each Eater move and Passer reply on the old root position and comparing keys.
+        root, previous = self.root, self.root_state
+        self.root = self.root_state = None
+        if root is None or previous.size != state.size:
+            return None
+        key = state.zobrist_key()
+        for child, move in zip(root.children or (), root.moves or ()):
+            self._play(previous, move)
+            for grandchild, reply in zip(child.children or (), child.moves or ()):
+                self._play(previous, reply)
+                found = previous.zobrist_key() == key
+                previous.unmake_move()
+                if found:
+                    return grandchild
+            previous.unmake_move()
+        return None
+
+    def _grow(self, state, time_budget=None): #Builds the search tree for `state` and returns its root.
+        if time_budget is None:
+            time_budget = self.time_budget
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        state = state.copy() #The one working state: each iteration plays the path down the tree onto it and takes it back afterwards.
+        root = self._reused_root(state) if self.reuse else None
+        if self.rollout_batch and (self.batch is None or self.batch.size != state.size):
+            self.batch = BatchRollouts(state.size, self.max_depth, seed=random.randrange(2 ** 32))
+        if root is None:
+            root = MCTSNode(state) #Creates a root node for the current game state.
+        self.carried = root.visits
+        self.iterations_run = 0
+        while self.iterations is None or root.visits < self.iterations: #performs iterations until the cap or the deadline
+            if deadline is not None and self.iterations_run and time.perf_counter() >= deadline:
+                break
+            self.iterations_run += 1
+            path = self._select(root, state) #Selection: Chooses a node to explore (_select).
+            if not path[-1].is_fully_expanded():
+                child = self._expand(path[-1], state)  #Expansion: If the node isn’t terminal and has untried moves, expands it (_expand)
+                if child is not None:
+                    path.append(child)
+            if self.batch is None:
+                reward = self._simulate(state) #Simulation: Simulates a random game from the node’s state (_simulate)
+            else:
+                reward = float(self.batch.evaluate([state], self.rollout_batch)[0])
+            self._backpropagate(path, reward) #Backpropagation: Updates node statistics (_backpropagate)
+            while state.undo_stack: #Back to the root position for the next iteration.
+                state.unmake_move()
+        if self.reuse:
+            self.root, self.root_state = (root, state) if root.visits <= self.keep_visits else (None, None)
+        return root
+
+    def _select(self, node, state): #Moves to the best child (via best_child) until it reaches a terminal state or a node with untried moves. Returns the path from the root.
+        path = [node]
+        while node.children and node.is_fully_expanded():
+            best = node.best_child()
+            self._play(state, node.moves[best])
+            node = node.children[best]
+            path.append(node)
+        return path
+
+    def _play(self, state, move): #Applies a tree move to the working state and switches the player.
+        state.make_move(move, state.current_player)
+        state.current_player = 'E' if state.current_player == 'P' else 'P'
+
+    def _expand(self, node, state): #xpands the node by trying an untried move.
+        if node.moves is None:
+            moves = node.get_priority_moves(state)
+            if state.is_mirror_symmetric(): #Mirror moves lead to mirror-image positions, so one child per mirror pair is enough.
+                moves = drop_mirror_moves(moves, state.size)
+            coords = state.geometry.coords #Shares one tuple per cell instead of allocating a move tuple per node.
+            node.moves = tuple(coords[i * state.size + j] for i, j in moves)
+            if not node.moves:
+                return None
+            node.children = []
+        self._play(state, node.moves[len(node.children)]) #Takes the first untried move.
+        child_node = MCTSNode(state) #Creates a new child node and returns it.
         node.children.append(child_node)
         return child_node
 
-    def _simulate(self, state): #Simulates a game from the given state to estimate the outcome.
-        current_state = state.copy()
+    def _simulate(self, state): #Simulates a game from the given state to estimate the outcome. Plays on the state in place and takes every move back before returning.
+        current_state = state
+        made = len(state.undo_stack)
         depth = 0
         while not (current_state.check_passer_win() or current_state.check_eater_win()) and depth < self.max_depth:
-            legal_moves = current_state.get_legal_moves()
+            legal_moves = current_state.legal_moves_view()
             if not legal_moves:
                 break
+            threats = current_state.passer_threats() #Cells where one Passer marker wins, so forced replies need no search.
             if current_state.current_player == 'P':
-                # Smarter Passer simulation: extend the longest path
+                # Smarter Passer simulation: win if one marker completes a path, otherwise extend the longest path
                 path, end = current_state.find_passer_path()
                 move = None
-                if end and 0 <= end[0] < current_state.size and 0 <= end[1] < current_state.size and (end[0], end[1]) in legal_moves:
+                if threats:
+                    move = threats[0]
+                elif end and 0 <= end[0] < current_state.size and 0 <= end[1] < current_state.size and current_state.is_legal(end):
                     move = (end[0], end[1])
                 else:
                     move_scores = []
@@ -244,8 +264,11 @@ class MCTS:
                     move = max(move_scores, key=lambda x: x[1])[0]
                 current_state.make_move(move, 'P')
             else:
-                # Eater tries to maximize Passer's path length
-                best_move = max(legal_moves, key=lambda move: self._score_move_for_eater(current_state, move))
+                if threats: # Forced: win now if the Eater can, otherwise block the Passer's winning cell
+                    winning_moves = current_state.eater_winning_moves()
+                    best_move = winning_moves[0] if winning_moves else threats[0]
+                else: # Eater tries to maximize Passer's path length
+                    best_move = self._best_eater_move(current_state)
                 current_state.make_move(best_move, 'E') #make the best move
             if current_state.current_player == 'P' and current_state.check_passer_win():
                 break
@@ -253,18 +276,50 @@ class MCTS:
             depth += 1
 
         if current_state.check_passer_win():
-            return -1  # Bad for Eater
+            reward = -1  # Bad for Eater
         elif current_state.check_eater_win():
-            return 1  # Good for Eater
+            reward = 1  # Good for Eater
         else:
             # Heuristic: Maximize Passer's path length
             path_length = self._find_passer_path_length(current_state)
-            return 1.0 / (path_length + 1) if path_length != float('inf') else 0
+            reward = 1.0 / (path_length + 1) if path_length != float('inf') else 0
+        while len(state.undo_stack) > made:
+            state.unmake_move()
+        return reward
+
+    def _best_eater_move(self, state): #The legal move with the best _score_move_for_eater score (first on ties, like max()), all candidates scored in one pass.
+        size = state.size
+        legal_moves = state.legal_moves_view()
+        base = self._find_passer_path_length(state) #An 'E' on an empty cell leaves the Passer's chain, and so this length, alone.
+        if base == float('inf'):
+            base = 1000
+        last = state.get_passer_last_move()
+        near = _distance_bonus(size)[last[0] * size + last[1]] if last else None
+        overwrites = []
+        if state.eater_turn_count % 3 == 2:
+            overwrites = [i * size + j for i, j in iter_cells(state.moves_mask & state.passer_mask, state.geometry)]
+        if np is not None:
+            scores = np.where(_mask_array(state.moves_mask, size * size), float(base), -np.inf)
+            if overwrites: #No overwrite bonus: _score_move_for_eater only gives it on turns where 'P' cells aren't legal.
+                scores[overwrites] = _overwrite_lengths(state, overwrites)
+            if near is not None:
+                scores += near
+            return state.geometry.coords[int(np.argmax(scores))]
+        coords = state.geometry.coords
+        exact = {coords[k]: self._score_move_for_eater(state, coords[k]) for k in overwrites} #Without NumPy, overwrites are still tried one by one.
+        best, best_score = None, float('-inf')
+        for move in legal_moves:
+            score = exact.get(move)
+            if score is None:
+                score = base + near[move[0] * size + move[1]] if near else base
+            if score > best_score:
+                best, best_score = move, score
+        return best
 
     def _score_move_for_eater(self, state, move):
-        temp_state = state.copy()
-        temp_state.make_move(move, 'E')
-        path_length = self._find_passer_path_length(temp_state)
+        state.make_move(move, 'E') #Tries the move in place and takes it back, instead of copying the state per candidate.
+        path_length = self._find_passer_path_length(state)
+        state.unmake_move()
         score = path_length if path_length != float('inf') else 1000
         # Bonus for overwrite moves
         if state.eater_turn_count % 3 == 0 and state.board[move[0]][move[1]] == 'P':
@@ -294,22 +349,77 @@ class MCTS:
             return len(path) + remaining_distance
         return float('inf')
 
-    def _backpropagate(self, node, reward): #Updates the statistics of all nodes from the simulated node to the root.
-        while node is not None:
+    def _backpropagate(self, path, reward): #Updates the statistics of all nodes from the simulated node to the root.
+        for node in reversed(path):
             node.visits += 1
             node.wins += reward
-            node = node.parent
             reward = -reward
 
-def cpu_move(game, difficulty="hard"): #Determines the Eater’s move.
+_DISTANCE_BONUS = {} #Board size -> per last Passer move, the distance bonus of every cell (a NumPy matrix when NumPy is available).
+
+def _distance_bonus(size): #_score_move_for_eater's predictive-blocking bonus, 20 / (d + 1) within Manhattan distance d <= 2 of the last Passer move, for every pair of cells.
+    if size not in _DISTANCE_BONUS:
+        cells = [(i, j) for i in range(size) for j in range(size)]
+        rows = [[20 / (d + 1) if d <= 2 else 0.0 for d in (abs(i - a) + abs(j - b) for a, b in cells)] for i, j in cells]
+        _DISTANCE_BONUS[size] = np.array(rows) if np is not None else tuple(map(tuple, rows))
+    return _DISTANCE_BONUS[size]
+
+def _overwrite_lengths(state, cells): #_find_passer_path_length (1000 for no chain) after an 'E' on each of these 'P' cells, from one flood over a stack of boards with one cell taken each.
+    size = state.size
+    boards = np.repeat(_mask_array(state.passer_mask, size * size)[None], len(cells), axis=0)
+    boards[np.arange(len(cells)), cells] = False
+    row, _, steps = deepest(flood(boards.reshape(len(cells), size, size)))
+    return np.where(row >= 0, steps + size - row, 1000)
+
+def _mask_array(mask, cells): #Boolean array of a cell mask's bits, cell i * size + j at index i * size + j.
+    bits = np.frombuffer(mask.to_bytes((cells + 7) // 8, 'little'), dtype=np.uint8)
+    return np.unpackbits(bits, count=cells, bitorder='little').view(bool)
+
+# Pool side of search_parallel: one MCTS per worker process, growing a fresh tree per task
+_worker = None
+
+def _init_worker(iterations, max_depth, time_budget, rollout_batch):
+    global _worker
+    _worker = MCTS(iterations=iterations, max_depth=max_depth, time_budget=time_budget, rollout_batch=rollout_batch)
+
+def _grow_root(state, seed, time_budget):
+    # Returns the root's moves with the visits and wins of each child grown
+    random.seed(seed)
+    root = _worker._grow(state, time_budget)
+    children = root.children or ()
+    return root.moves or (), [child.visits for child in children], [child.wins for child in children]
+
+_PLAYERS = {} #One MCTS per difficulty and worker count, kept between turns so each serial search starts from the subtree of the moves played since (and a parallel one keeps its pool).
+MAX_PLAYERS = 4 #Cached players beyond this are closed, oldest first.
+
+def close_players(): #Closes every cached player: worker pools shut down and kept trees dropped. Runs at exit.
+    for mcts in _PLAYERS.values():
+        mcts.close()
+    _PLAYERS.clear()
+
+atexit.register(close_players)
+
+def cpu_move(game, difficulty="hard", solve_below=SOLVE_BELOW, time_budget=None, workers=1): #Determines the Eater’s move. time_budget (seconds) stops the search early; the iteration count stays the cap. workers > 1 grows one tree per worker process.
     print("Eater is thinking...")
-    legal_moves = game.get_legal_moves()
-    for move in legal_moves:
-        game_copy = game.copy()
-        game_copy.make_move(move, 'E')
-        if game_copy.check_eater_win():
-            print("Eater has chosen its move.")
-            return move
+    winning_moves = game.eater_winning_moves() #Every immediately winning cell in one pass.
+    if winning_moves:
+        print("Eater has chosen its move.")
+        return winning_moves[0]
+
+    move = book_move(game) #Opening positions were searched offline; the book answers in microseconds.
+    if move is not None:
+        print("Eater plays from its opening book.")
+        return move
+
+    started = time.perf_counter()
+    solver = solve_endgame(game, solve_below, time_budget=time_budget) #With few empty cells left, prove the outcome exactly instead of sampling it.
+    if solver is not None:
+        if solver.winner == 'E':
+            print(f"Eater has solved the endgame (proof of {solver.proof_size} positions, {solver.nodes} nodes).")
+            return solver.best_move
+        print(f"The Passer wins with best play (proof of {solver.proof_size} positions); searching anyway.")
+    if time_budget is not None: #The search only gets what the proof attempt left of the budget.
+        time_budget = max(time_budget - (time.perf_counter() - started), 0)
 
     # Adjust MCTS parameters based on difficulty
     if difficulty == "hard":
@@ -321,13 +431,19 @@ def cpu_move(game, difficulty="hard"): #Determines the Eater’s move.
     else:
         iterations = 200
         max_depth = 3
-    mcts = MCTS(iterations=iterations, max_depth=max_depth)
-    move = mcts.search(game)
+    mcts = _PLAYERS.get((difficulty, workers))
+    if mcts is None:
+        if len(_PLAYERS) >= MAX_PLAYERS:
+            _PLAYERS.pop(next(iter(_PLAYERS))).close()
+        mcts = _PLAYERS[difficulty, workers] = MCTS(iterations=iterations, max_depth=max_depth, reuse=True, workers=workers)
+    move = mcts.search(game, time_budget)
+    if mcts.carried:
+        print(f"Eater kept {mcts.carried} visits from its last search.")
     print("Eater has chosen its move.")
     return move
 
-def play_game(size, difficulty="hard"):
-    game = GameState(size)
+def play_game(size, difficulty="hard", backend="list"):
+    game = new_state(size, backend)
     print("Welcome to the Eater game! You are the Passer (P). Connect the top to the bottom with your markers.")
     print(f"The CPU is the Eater (E) in {difficulty} mode using MCTS. It wins by making it impossible for you to connect.")
     print("Paths can move down, left, right, down-left, or down-right (no upward movement).")
@@ -346,7 +462,7 @@ def play_game(size, difficulty="hard"):
                         return
                     row, col = map(int, user_input.split())
                     move = (row - 1, col - 1)
-                    if move in game.get_legal_moves():
+                    if game.is_legal(move):
                         break
                     else:
                         print("Invalid move! Cell must be empty. Try again.")
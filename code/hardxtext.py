@@ -1,126 +1,6 @@
 import random
 import math
-
-class GameState:
-    def __init__(self, size):
-        self.size = size
-        self.board = [[None for _ in range(size)] for _ in range(size)]  # None: empty, 'P': Passer, 'E': Eater
-        self.current_player = 'P'  # Passer starts
-        self.eater_turn_count = 0  # Track Eater's turns for overwrite restriction
-        self.passer_win_cache = None  # Cache for Passer win condition
-        self.eater_win_cache = None  # Cache for Eater win condition
-        self.last_move = None  # Track last move to invalidate cache
-        self.passer_last_move = None  # Track Passer's last move
-
-    def get_legal_moves(self):
-        if self.current_player == 'P':
-            return [(i, j) for i in range(self.size) for j in range(self.size) if self.board[i][j] is None]
-        else:  # Eater
-            if self.eater_turn_count % 3 == 2:  # Overwrite allowed every 3 turns (turns 3, 6, 9, ...)
-                return [(i, j) for i in range(self.size) for j in range(self.size)]
-            else:  # Other turns: must place in empty cell
-                return [(i, j) for i in range(self.size) for j in range(self.size) if self.board[i][j] is None]
-
-    def make_move(self, move, player):
-        i, j = move
-        self.last_move = (move, player)  # Invalidate cache on move
-        self.passer_win_cache = None
-        self.eater_win_cache = None
-        if player == 'E':
-            self.board[i][j] = 'E'
-            self.eater_turn_count += 1
-        elif player == 'P' and self.board[i][j] is None:
-            self.board[i][j] = 'P'
-            self.passer_last_move = (i, j)  # Update Passer's last move
-    def check_passer_win(self):
-        if self.passer_win_cache is not None:
-            return self.passer_win_cache
-
-    visited = set()
-    
-    def dfs(i, j):
-        # First, check if indices are out of bounds or invalid
-        if (i, j) in visited or i < 0 or i >= self.size or j < 0 or j >= self.size or self.board[i][j] != 'P':
-            return False
-        # Now safe to check the base case
-        if i == self.size - 1:
-            return True
-        visited.add((i, j))
-        return any(dfs(i + di, j + dj) for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)])
-
-        passer_wins = any(dfs(0, j) for j in range(self.size) if self.board[0][j] == 'P')
-        self.passer_win_cache = passer_wins
-        return self.passer_win_cache
-    
-    def check_eater_win(self):
-        if self.eater_win_cache is not None:
-            return self.eater_win_cache
-
-        for i in range(self.size):
-            if all(self.board[i][j] == 'E' for j in range(self.size)): #checks if eater has occupied an entire row
-                self.eater_win_cache = True
-                return True
-
-        visited = set()
-        def dfs(i, j): # Uses DFS to check if the Passer can form a path from the top row to the bottom row using 'P' or empty cells (None).
-            if i == self.size - 1:
-                return True
-            if (i, j) in visited or i < 0 or i >= self.size or j < 0 or j >= self.size or self.board[i][j] == 'E':
-                return False
-            visited.add((i, j))
-            return any(dfs(i + di, j + dj) for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)])
-
-        can_passer_win = any(dfs(0, j) for j in range(self.size) if self.board[0][j] != 'E')
-        self.eater_win_cache = not can_passer_win #The Eater wins if no such path exists (not can_passer_win).
-        return self.eater_win_cache
-
-    def find_passer_path(self): #finds the longest path the passer has made (used by the eater to prioritize blocking moves & used in the MCTS sim)
-        best_path = []
-        best_length = 0
-        best_end = None
-
-        for start_col in range(self.size):
-            if self.board[0][start_col] != 'P':
-                continue
-            visited = set()
-            path = [(0, start_col)]
-            def dfs(i, j):
-                nonlocal path, best_path, best_length, best_end
-                if (i, j) in visited or i < 0 or i >= self.size or j < 0 or j >= self.size or self.board[i][j] != 'P':
-                    if len(path) > best_length:
-                        best_length = len(path)
-                        best_path = path[:]
-                        best_end = (i, j)
-                    return
-                visited.add((i, j))
-                for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)]:
-                    path.append((i + di, j + dj))
-                    dfs(i + di, j + dj)
-                    path.pop()
-
-            dfs(0, start_col)
-
-        return best_path, best_end
-
-    def display(self):
-        print('   ', ' '.join(str(i + 1) for i in range(self.size)))
-        for i in range(self.size):
-            row = [self.board[i][j] if self.board[i][j] else '|' for j in range(self.size)]
-            print(f'{i + 1:2} ', ' '.join(row))
-
-    def get_passer_last_move(self):
-        return self.passer_last_move
-
-    def copy(self): #Creates deep copy of the curr game state. Used in MCTS to simulate moves without modifying the actual game state.
-        new_state = GameState(self.size)
-        new_state.board = [row[:] for row in self.board]
-        new_state.current_player = self.current_player
-        new_state.eater_turn_count = self.eater_turn_count
-        new_state.passer_win_cache = self.passer_win_cache
-        new_state.eater_win_cache = self.eater_win_cache
-        new_state.last_move = self.last_move
-        new_state.passer_last_move = self.passer_last_move
-        return new_state
+from rules import new_state
 
 class MCTSNode:
     def __init__(self, state, move=None, parent=None):
@@ -232,19 +112,19 @@ class MCTS:
             if current_state.current_player == 'E':
                 best_move = None
                 best_score = float('-inf')
+                winning_moves = set(current_state.eater_winning_moves()) #Every winning cell in one pass, so candidates need no win check.
                 for move in legal_moves:
                     i, j = move
                     score = 0
                     current_state.make_move(move, 'E')
-                    if current_state.check_eater_win(): #If the move wins for the Eater, assigns an infinite score.
+                    if move in winning_moves: #If the move wins for the Eater, assigns an infinite score.
                         score = float('inf')
                     else:
                         row_count = sum(1 for col in range(current_state.size) if current_state.board[i][col] == 'E')
                         score += row_count * 10 #Otherwise, scores based on the number of 'E' markers in the row
                         if current_state.eater_turn_count % 3 == 0 and move == current_state.get_passer_last_move():
                             score += 20 #Adds a bonus (+20) if the move overwrites the Passer’s last move on an overwrite turn.
-                    current_state.board[i][j] = None
-                    current_state.eater_turn_count -= 1
+                    current_state.unmake_move()
                     if score > best_score: #Chooses the move with the highest score.
                         best_score = score
                         best_move = move
@@ -288,13 +168,10 @@ class MCTS:
 
 def cpu_move(game): #Determines the Eater’s move.
     print("Eater is thinking...")
-    legal_moves = game.get_legal_moves()
-    for move in legal_moves:
-        game_copy = game.copy()
-        game_copy.make_move(move, 'E')
-        if game_copy.check_eater_win():
-            print("Eater has chosen its move.")
-            return move
+    winning_moves = game.eater_winning_moves() #Every immediately winning cell in one pass.
+    if winning_moves:
+        print("Eater has chosen its move.")
+        return winning_moves[0]
 
     mcts = MCTS(iterations=500)
     move = mcts.search(game)
@@ -304,8 +181,8 @@ def cpu_move(game): #Determines the Eater’s move.
         print("Eater's turn to take over!!")
     return move
 
-def play_game(size):
-    game = GameState(size)
+def play_game(size, backend="list"):
+    game = new_state(size, backend)
     print("Welcome to the Eater game! You are the Passer (P). Connect the top to the bottom with your markers.")
     print("The CPU is the Eater (E) in hard mode using MCTS. It wins by making it impossible for you to connect.")
     print("Paths can move down, left, right, down-left, or down-right (no upward movement).")
@@ -324,7 +201,7 @@ def play_game(size):
                         return
                     row, col = map(int, user_input.split())
                     move = (row - 1, col - 1)
-                    if move in game.get_legal_moves():
+                    if game.is_legal(move):
                         break
                     else:
                         print("Invalid move! Cell must be empty. Try again.")
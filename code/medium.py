@@ -1,197 +1,325 @@
 import random
 import math
-
-
-class GameState:
-    def __init__(self, size):
-        self.size = size
-        self.board = [[None for _ in range(size)] for _ in range(size)]
-        self.current_player = 'P'
-        self.eater_turn_count = 0  # Track turns for overwrite ability
-        self.passer_win_cache = None
-        self.eater_win_cache = None
-        self.last_move = None
-        self.passer_last_move = None
-
-    def get_legal_moves(self):
-        if self.current_player == 'P':
-            return [(i, j) for i in range(self.size) for j in range(self.size) if self.board[i][j] is None]
+import time
+import multiprocessing
+from rules import new_state, mirror_move, drop_mirror_moves
+from pns import solve_endgame, SOLVE_BELOW
+from book import book_move
+
+
+# Transposition table bound types
+EXACT = 0
+LOWER = 1  # Search failed high, the true score is at least this
+UPPER = 2  # Search failed low, the true score is at most this
+
+
+class TranspositionTable:
+    # Fixed number of slots indexed by Zobrist key, each holding (key, depth, score, bound, best move,
+    # generation). Scores count plies from the root of the search that stored them, so only entries
+    # from the current generation (search) are trusted for cutoffs; older ones still supply a best
+    # move to try first. A slot is overwritten unless it holds a deeper result from this search.
+    def __init__(self, max_entries=200000):
+        self.max_entries = max_entries
+        self.slots = [None] * max_entries
+        self.filled = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def probe(self, key):
+        entry = self.slots[key % self.max_entries]
+        if entry is None or entry[0] != key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1:]
+
+    def store(self, key, depth, score, bound, best_move):
+        index = key % self.max_entries
+        existing = self.slots[index]
+        if existing is None:
+            self.filled += 1
         else:
-            # Eater can overwrite Passer's cells every 3rd turn
-            if self.eater_turn_count % 3 == 2:
-                return [(i, j) for i in range(self.size) for j in range(self.size)]
-            else:
-                return [(i, j) for i in range(self.size) for j in range(self.size) if self.board[i][j] is None]
-
-    def make_move(self, move, player):
-        i, j = move
-        self.last_move = (move, player)
-        self.passer_win_cache = None
-        self.eater_win_cache = None
-        if player == 'E':
-            self.board[i][j] = 'E'
-            self.eater_turn_count += 1
-        elif player == 'P' and self.board[i][j] is None:
-            self.board[i][j] = 'P'
-            self.passer_last_move = (i, j)
-
-    def check_passer_win(self):
-        # Check if Passer has connected top to bottom
-        if self.passer_win_cache is not None:
-            return self.passer_win_cache
-
-        visited = set()
-
-        def dfs(i, j):
-            if i == self.size - 1 and self.board[i][j] == 'P':
-                return True
-            if (i, j) in visited or i < 0 or i >= self.size or j < 0 or j >= self.size or self.board[i][j] != 'P':
-                return False
-            visited.add((i, j))
-            return any(dfs(i + di, j + dj) for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)])
-
-        passer_wins = any(dfs(0, j) for j in range(self.size) if self.board[0][j] == 'P')
-        self.passer_win_cache = passer_wins
-        return self.passer_win_cache
-
-    def check_eater_win(self):
-        # Eater wins by blocking all possible paths or filling a row
-        if self.eater_win_cache is not None:
-            return self.eater_win_cache
-
-        # Check if Eater has filled a row
-        for i in range(self.size):
-            if all(self.board[i][j] == 'E' for j in range(self.size)):
-                self.eater_win_cache = True
-                return True
-
-        visited = set()
-
-        def dfs(i, j):
-            # Check if Passer can still connect top to bottom through P or empty cells
-            if i == self.size - 1:
-                return True
-            if (i, j) in visited or i < 0 or i >= self.size or j < 0 or j >= self.size or self.board[i][j] == 'E':
-                return False
-            visited.add((i, j))
-            return any(dfs(i + di, j + dj) for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)])
-
-        # Eater wins if Passer has no possible path
-        can_passer_win = any(dfs(0, j) for j in range(self.size) if self.board[0][j] != 'E')
-        self.eater_win_cache = not can_passer_win
-        return self.eater_win_cache
-
-    def find_passer_path(self):
-        # Find the longest path Passer has made from top row
-        best_path = []
-        best_length = 0
-        best_end = None
-
-        for start_col in range(self.size):
-            if self.board[0][start_col] != 'P':
-                continue
-            visited = set()
-            path = [(0, start_col)]
-
-            def dfs(i, j):
-                nonlocal path, best_path, best_length, best_end
-                if (i, j) in visited or i < 0 or i >= self.size or j < 0 or j >= self.size or self.board[i][j] != 'P':
-                    if len(path) > best_length:
-                        best_length = len(path)
-                        best_path = path[:]
-                        best_end = (i, j)
-                    return
-                visited.add((i, j))
-                for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)]:
-                    path.append((i + di, j + dj))
-                    dfs(i + di, j + dj)
-                    path.pop()
-
-            dfs(0, start_col)
-
-        return best_path, best_end
-
-    def display(self):
-        print('   ', ' '.join(str(i + 1) for i in range(self.size)))
-        for i in range(self.size):
-            row = [self.board[i][j] if self.board[i][j] else '|' for j in range(self.size)]
-            print(f'{i + 1:2} ', ' '.join(row))
-
-    def get_passer_last_move(self):
-        return self.passer_last_move
-
-    def copy(self):
-        # Create deep copy of current game state
-        new_state = GameState(self.size)
-        new_state.board = [row[:] for row in self.board]
-        new_state.current_player = self.current_player
-        new_state.eater_turn_count = self.eater_turn_count
-        new_state.passer_win_cache = self.passer_win_cache
-        new_state.eater_win_cache = self.eater_win_cache
-        new_state.last_move = self.last_move
-        new_state.passer_last_move = self.passer_last_move
-        return new_state
+            if existing[5] == self.generation and existing[1] > depth:
+                return
+            if existing[0] != key:
+                self.evictions += 1
+        self.slots[index] = (key, depth, score, bound, best_move, self.generation)
+        self.stores += 1
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            'entries': self.filled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / probes if probes else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+        }
+
+
+class MoveOrdering:
+    # Killer moves per ply and a history table per side, both fed by cutoffs. Inner nodes of minimax
+    # try the table move first, then this ply's killers, then the rest by history score, so moves
+    # that refuted siblings are searched early and alpha-beta cuts sooner.
+    def __init__(self):
+        self.killers = {}  # ply -> [most recent, previous] moves that caused a cutoff at that ply
+        self.history = {'E': {}, 'P': {}}  # side -> {cell: score}
+
+    def new_search(self):
+        # Killers are ply-relative to the old root, so they go; history is kept but aged
+        self.killers = {}
+        for table in self.history.values():
+            for move in table:
+                table[move] //= 2
+
+    def order(self, state, moves, ply, side, first=None):
+        front = []
+        for move in (first, *self.killers.get(ply, ())):
+            if move is not None and move not in front and state.is_legal(move):
+                front.append(move)
+        history = self.history[side]
+        rest = sorted((move for move in moves if move not in front), key=lambda move: history.get(move, 0), reverse=True)
+        return front + rest
+
+    def record_cutoff(self, move, ply, side, remaining):
+        history = self.history[side]
+        history[move] = history.get(move, 0) + remaining * remaining  # Deeper cutoffs count for more
+        killers = self.killers.setdefault(ply, [None, None])
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+
+class SearchTimeout(Exception):
+    # Raised inside minimax when the move's time budget runs out
+    pass
 
 
 class MiniMaxPlayer:
-    def __init__(self, max_depth=3):
+    # Iterative deepening: get_move searches depth 1, 2, ... up to max_depth, each iteration trying
+    # the previous best move first. With a time budget it stops when the deadline hits and returns
+    # the best move of the deepest completed iteration; max_depth=None then means "as deep as time
+    # allows". Depth d searches the Eater's move plus d replies, as max_depth always has.
+    #
+    # With workers > 1 each iteration splits the root across a process pool (search_root_parallel)
+    # and still returns the move the serial search would.
+    #
+    # pvs=True searches every move after the first with a null window, which only has to show the
+    # move is no better than the best so far, and re-searches the few that turn out better (principal
+    # variation search). aspiration=w starts each serial iteration after the first with the window
+    # previous score +/- w, falling back to the full window when the score lands outside it.
+    #
+    # symmetry=True uses the rules' left-right mirror symmetry: the table is keyed by canonical
+    # position, so a position and its mirror image share an entry, and at mirror-symmetric positions
+    # only one move of each mirror pair is searched. The evaluation's middle-column term is only
+    # symmetric on odd board sizes, so even sizes search without it.
+    def __init__(self, max_depth=3, table_size=200000, time_budget=None, ordering=True, workers=1, pvs=False,
+                 aspiration=None, symmetry=True):
+        if max_depth is None and time_budget is None:
+            raise ValueError("MiniMaxPlayer needs a depth limit, a time budget or both")
         self.max_depth = max_depth
-
-    def get_move(self, game_state):
+        self.time_budget = time_budget  # Seconds per move, or None for no deadline
+        self.pvs = pvs
+        self.aspiration = aspiration
+        self.symmetry = symmetry
+        self.table_size = table_size
+        self.table = TranspositionTable(table_size) if table_size else None
+        self.ordering = MoveOrdering() if ordering else None
+        self.workers = workers
+        self.pool = None  # Started by the first parallel search, see close()
+        self.shared_alpha = None
+        self.search_id = 0
+        self.nodes = 0  # Nodes searched by the last get_move, all iterations together
+        self.cutoffs = 0  # Alpha-beta cutoffs in the last get_move
+        self.first_move_cutoffs = 0  # ... of which came from the first move searched
+        self.researches = 0  # Null-window searches that failed high and were searched again
+        self.aspiration_misses = 0  # Iterations whose score fell outside the aspiration window
+        self.depth_reached = 0  # Deepest iteration the last get_move completed
+        self.search_log = []  # Per completed iteration: (depth, nodes so far, seconds so far, best move, score)
+        self.search_depth = 0
+        self.deadline = None
+
+    def get_move(self, game_state, time_budget=None):
         print("Eater is thinking using Minimax...")
+        start = time.perf_counter()
+        if time_budget is None:
+            time_budget = self.time_budget
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.researches = 0
+        self.aspiration_misses = 0
+        self.depth_reached = 0
+        self.search_log = []
+        self.new_search()
         legal_moves = game_state.get_legal_moves()
 
         # Check for immediate winning moves first
-        for move in legal_moves:
-            game_copy = game_state.copy()
-            game_copy.make_move(move, 'E')
-            if game_copy.check_eater_win():
-                print("Eater found a winning move!")
-                return move
-
-        # Use minimax with alpha-beta pruning
-        best_score = float('-inf')
-        best_move = None
-        alpha = float('-inf')
-        beta = float('inf')
+        winning_moves = game_state.eater_winning_moves()
+        if winning_moves:
+            print("Eater found a winning move!")
+            return winning_moves[0]
 
+        # Use minimax with alpha-beta pruning, one iteration per depth
         prioritized_moves = self.prioritize_moves(game_state, legal_moves)
+        if self.mirrored(game_state) and game_state.is_mirror_symmetric():
+            prioritized_moves = drop_mirror_moves(prioritized_moves, game_state.size)
+        best_move = prioritized_moves[0] if prioritized_moves else None
+        max_depth = self.max_depth if self.max_depth is not None else len(legal_moves)
+        made = len(game_state.undo_stack)
+        self.deadline = None  # The first iteration always completes, so there is a move to return
+        for depth in range(1, max_depth + 1):
+            if self.workers > 1 and depth > 1 and len(prioritized_moves) >= 2 * self.workers:
+                search = self.search_root_parallel
+            else:  # Not worth a pool round trip
+                search = self.search_root
+            if self.table is not None:
+                # Scores count plies from the root, so only this iteration's entries are exact at this
+                # depth; older ones still order moves
+                self.table.new_search()
+            try:
+                move, score = search(game_state, prioritized_moves, depth)
+            except SearchTimeout:
+                while len(game_state.undo_stack) > made:  # Take back the moves of the abandoned line
+                    game_state.unmake_move()
+                break
+            best_move = move
+            self.depth_reached = depth
+            self.search_log.append((depth, self.nodes, time.perf_counter() - start, move, score))
+            # Search the previous best move first next time; the table orders the moves below it
+            prioritized_moves = [move] + [m for m in prioritized_moves if m != move]
+            if time_budget is not None:
+                self.deadline = start + time_budget
+                if time.perf_counter() >= self.deadline:
+                    break
+        self.deadline = None
+
+        print("Eater has chosen its move.")
+        return best_move
 
-        for move in prioritized_moves:
-            game_copy = game_state.copy()
-            game_copy.make_move(move, 'E')
-            game_copy.current_player = 'P'
+    def mirrored(self, state):
+        return self.symmetry and state.size % 2 == 1
+
+    def new_search(self):
+        self.search_id += 1
+        if self.ordering is not None:
+            self.ordering.new_search()
+
+    def search_root(self, game_state, moves, depth):
+        # One iteration at the given depth; returns (best move, score). The result is the first
+        # move, in the given order, with the best depth-limited minimax value
+        self.search_depth = depth
+        if self.aspiration is not None and self.search_log:
+            # Scores swing between odd and even depths, so centre on the last iteration that ended
+            # with the same side to move
+            previous = self.search_log[-2 if len(self.search_log) > 1 else -1][4]
+            alpha, beta = previous - self.aspiration, previous + self.aspiration
+            move, score = self.search_window(game_state, moves, alpha, beta)
+            if alpha < score < beta:
+                return move, score
+            self.aspiration_misses += 1  # Only a bound, so search again with the full window
+        return self.search_window(game_state, moves, float('-inf'), float('inf'))
+
+    def search_window(self, game_state, moves, alpha, beta):
+        best_score = float('-inf')
+        best_move = None
 
-            score = self.minimax(game_copy, 0, False, alpha, beta)
+        for index, move in enumerate(moves):
+            if self.pvs and index > 0:
+                score = self.search_move(game_state, move, alpha, math.nextafter(alpha, math.inf))
+                if alpha < score < beta:  # Better than the best so far after all: get its exact score
+                    self.researches += 1
+                    score = self.search_move(game_state, move, alpha, beta)
+            else:
+                score = self.search_move(game_state, move, alpha, beta)
 
             if score > best_score:
                 best_score = score
                 best_move = move
 
             alpha = max(alpha, best_score)
-
-        print("Eater has chosen its move.")
-        return best_move
+            if alpha >= beta:  # Fail high, the caller widens the window
+                break
+        return best_move, best_score
+
+    def search_move(self, game_state, move, alpha, beta):
+        game_state.make_move(move, 'E')
+        game_state.current_player = 'P'
+        score = self.minimax(game_state, 0, False, alpha, beta)
+        game_state.unmake_move()
+        return score
+
+    def search_root_parallel(self, game_state, moves, depth):
+        # Young brothers wait: the first move is searched here to get an alpha bound, then the
+        # others go to the pool, each starting from the best score any worker has found so far.
+        # Scores above the alpha a move started with are exact, the rest are upper bounds. An
+        # earlier move whose bound ties the best exact score might be the serial search's choice,
+        # so it is re-searched with a full window before picking the first best move in order.
+        self.search_depth = depth
+        best_score = self.search_move(game_state, moves[0], float('-inf'), float('inf'))
+        if self.pool is None:
+            self.shared_alpha = multiprocessing.Value('d', float('-inf'))
+            self.pool = multiprocessing.Pool(self.workers, initializer=_init_worker,
+                                             initargs=(self.shared_alpha, self.table_size, self.ordering is not None,
+                                                       self.pvs, self.symmetry))
+        self.shared_alpha.value = best_score
+        seconds_left = None if self.deadline is None else self.deadline - time.perf_counter()
+        root = game_state.copy()
+        tasks = [(root, move, depth, self.search_id, seconds_left) for move in moves[1:]]
+        results = [(best_score, float('-inf'), 0)] + self.pool.starmap(_search_root_move, tasks)
+        if any(result is None for result in results):
+            raise SearchTimeout
+        self.nodes += sum(nodes for _, _, nodes in results)
+        best_score = max(score for score, alpha, _ in results if score > alpha)
+        for index, (score, alpha, _) in enumerate(results):
+            if score <= alpha and score >= best_score:
+                score = self.search_move(game_state, moves[index], float('-inf'), float('inf'))
+            if score == best_score:
+                return moves[index], best_score
+
+    def close(self):
+        # Shuts down the worker pool of a parallel player
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
 
     def prioritize_moves(self, state, legal_moves):
         # Sort moves by potential value to improve alpha-beta pruning
         move_scores = []
 
-        # Prioritize overwrite moves on Passer's last move
+        # Prioritize overwrite moves on Passer markers that lie on a minimum cut of the Passer's
+        # routes, then on Passer's last move
+        ranking = state.cut_ranking()
         if state.eater_turn_count % 3 == 2:
             last_passer_move = state.get_passer_last_move()
-            if last_passer_move and last_passer_move in legal_moves:
+            for i, j in legal_moves:
+                if state.board[i][j] == 'P' and ranking[i * state.size + j] == 2 and (i, j) != last_passer_move:
+                    move_scores.append(((i, j), 900))
+            if last_passer_move and state.is_legal(last_passer_move):
                 move_scores.append((last_passer_move, 1000))
 
-        # Prioritize moves along Passer's path
+        # Prioritize moves along Passer's path, then other cells on a minimum cut
         path, _ = state.find_passer_path()
+        path_cells = set(path)
+        overwrites = {move for move, _ in move_scores}
         for move in legal_moves:
-            if move in path:
+            if move in path_cells:
                 move_scores.append((move, 500))
+            elif ranking[move[0] * state.size + move[1]] == 2 and move not in overwrites:
+                move_scores.append((move, 400))
 
         # Score remaining moves based on heuristics
+        scored = {move for move, _ in move_scores}
+        row_eater_counts = [row.count('E') for row in state.board]
         for move in legal_moves:
-            if any(m[0] == move for m in move_scores):
+            if move in scored:
                 continue
 
             row, col = move
@@ -199,7 +327,7 @@ class MiniMaxPlayer:
             central_score = (state.size // 2 - abs(row - state.size // 2)) + (
                     state.size // 2 - abs(col - state.size // 2))
             # Prefer rows with existing Eater pieces
-            row_eater_count = sum(1 for j in range(state.size) if state.board[row][j] == 'E')
+            row_eater_count = row_eater_counts[row]
 
             score = row_eater_count * 10 + central_score
             move_scores.append((move, score))
@@ -208,56 +336,147 @@ class MiniMaxPlayer:
         prioritized_moves = [move for move, score in sorted(move_scores, key=lambda x: x[1], reverse=True)]
 
         # Add any remaining legal moves
+        seen = set(prioritized_moves)
         for move in legal_moves:
-            if move not in prioritized_moves:
+            if move not in seen:
                 prioritized_moves.append(move)
 
         return prioritized_moves
 
     def minimax(self, state, depth, is_maximizing, alpha, beta):
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 255 and time.perf_counter() >= self.deadline:
+            raise SearchTimeout
         # Terminal conditions
         if state.check_eater_win():
             return 1000 - depth  # Prefer quicker wins
         elif state.check_passer_win():
             return -1000 + depth  # Prefer slower losses
-        elif depth >= self.max_depth:
-            return self.evaluate_board(state)
 
-        legal_moves = state.get_legal_moves()
-        if not legal_moves:
-            return 0
+        # Reuse a result searched at least this deep (leaf evaluations included)
+        key = None
+        table_move = None
+        remaining = self.search_depth - depth
+        mirrored = False  # Keyed by the mirror image, so stored moves are mirrored too
+        if self.table is not None:
+            if self.mirrored(state):
+                key, mirrored = state.canonical_key()
+            else:
+                key = state.zobrist_key()
+            entry = self.table.probe(key)
+            if entry is not None:
+                entry_depth, score, bound, table_move, generation = entry
+                if mirrored and table_move is not None:
+                    table_move = mirror_move(table_move, state.size)
+                # Exactly this deep, so a score is a function of the position alone and every
+                # process searching the same root computes the same values
+                if generation == self.table.generation and entry_depth == remaining:
+                    if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                        return score
+
+        if remaining <= 0:
+            score = self.evaluate_board(state)
+            if key is not None:
+                self.table.store(key, 0, score, EXACT, None)
+            return score
+
+        # A cell where one Passer marker completes a path settles the node without a search: the Passer
+        # plays it, and facing two of them an Eater that can neither win nor overwrite blocks one and
+        # loses to the other. Facing one, blocking it is the only move that doesn't lose at once.
+        forced = None
+        threats = state.passer_threats()
+        if threats:
+            if not is_maximizing:
+                return -1000 + depth + 1
+            if remaining >= 2 and state.eater_turn_count % 3 != 2 and not state.eater_winning_moves():
+                if len(threats) >= 2:
+                    return -1000 + depth + 2
+                forced = threats
+
+        side = 'E' if is_maximizing else 'P'
+        if forced:
+            legal_moves = forced
+        else:
+            legal_moves = state.legal_moves_view()
+            if not legal_moves:
+                return 0
+            if self.ordering is not None:  # Table move, killers, then history
+                legal_moves = self.ordering.order(state, legal_moves, depth, side, table_move)
+            elif table_move is not None and state.is_legal(table_move):  # Try the stored best move first
+                legal_moves = [table_move] + [move for move in legal_moves if move != table_move]
+            if self.mirrored(state) and state.is_mirror_symmetric():  # Mirror moves have mirror-image subtrees
+                legal_moves = drop_mirror_moves(legal_moves, state.size)
+        alpha_start, beta_start = alpha, beta
+        best_move = None
+        cutoff_at = None
 
         if is_maximizing:  # Eater's turn (maximize)
-            max_eval = float('-inf')
-            for move in legal_moves:
-                new_state = state.copy()
-                new_state.make_move(move, 'E')
-                new_state.current_player = 'P'
-                eval_score = self.minimax(new_state, depth + 1, False, alpha, beta)
-                max_eval = max(max_eval, eval_score)
+            best_eval = float('-inf')
+            for index, move in enumerate(legal_moves):
+                state.make_move(move, 'E')
+                state.current_player = 'P'
+                if self.pvs and index > 0:
+                    eval_score = self.minimax(state, depth + 1, False, alpha, math.nextafter(alpha, math.inf))
+                    if alpha < eval_score < beta:  # Null window failed high: search it properly
+                        self.researches += 1
+                        eval_score = self.minimax(state, depth + 1, False, alpha, beta)
+                else:
+                    eval_score = self.minimax(state, depth + 1, False, alpha, beta)
+                state.unmake_move()
+                if eval_score > best_eval:
+                    best_eval = eval_score
+                    best_move = move
                 alpha = max(alpha, eval_score)
                 if beta <= alpha:
+                    cutoff_at = index
                     break  # Beta cutoff
-            return max_eval
         else:  # Passer's turn (minimize)
-            min_eval = float('inf')
-            for move in legal_moves:
-                new_state = state.copy()
-                new_state.make_move(move, 'P')
-                new_state.current_player = 'E'
-                eval_score = self.minimax(new_state, depth + 1, True, alpha, beta)
-                min_eval = min(min_eval, eval_score)
+            best_eval = float('inf')
+            for index, move in enumerate(legal_moves):
+                state.make_move(move, 'P')
+                state.current_player = 'E'
+                if self.pvs and index > 0:
+                    eval_score = self.minimax(state, depth + 1, True, math.nextafter(beta, -math.inf), beta)
+                    if alpha < eval_score < beta:  # Null window failed low: search it properly
+                        self.researches += 1
+                        eval_score = self.minimax(state, depth + 1, True, alpha, beta)
+                else:
+                    eval_score = self.minimax(state, depth + 1, True, alpha, beta)
+                state.unmake_move()
+                if eval_score < best_eval:
+                    best_eval = eval_score
+                    best_move = move
                 beta = min(beta, eval_score)
                 if beta <= alpha:
+                    cutoff_at = index
                     break  # Alpha cutoff
-            return min_eval
+
+        if cutoff_at is not None:
+            self.cutoffs += 1
+            if cutoff_at == 0:
+                self.first_move_cutoffs += 1
+            if self.ordering is not None:
+                self.ordering.record_cutoff(best_move, depth, side, remaining)
+
+        if key is not None:
+            if best_eval <= alpha_start:
+                bound = UPPER
+            elif best_eval >= beta_start:
+                bound = LOWER
+            else:
+                bound = EXACT
+            if mirrored and best_move is not None:
+                best_move = mirror_move(best_move, state.size)
+            self.table.store(key, remaining, best_eval, bound, best_move)
+        return best_eval
 
     def evaluate_board(self, state):
-        # Heuristic evaluation - positive favors Eater, negative favors Passer
+        # Heuristic evaluation - positive favors Eater, negative favors Passer. Every term comes from
+        # counts the state keeps up to date in make_move/unmake_move; evalcheck.py holds the
+        # from-scratch version it must agree with
         # Check for nearly completed rows (good for Eater)
         row_scores = 0
-        for i in range(state.size):
-            eater_count = sum(1 for j in range(state.size) if state.board[i][j] == 'E')
+        for eater_count in state.row_eaters:
             if eater_count == state.size:
                 return 900  # Almost win
             row_scores += (eater_count * eater_count) / state.size  # Square for emphasis
@@ -282,59 +501,95 @@ class MiniMaxPlayer:
         return eater_score - passer_score
 
     def calculate_connectivity(self, state):
-        # Measure how connected Passer's pieces are
-        connectivity = 0
-        for i in range(state.size):
-            for j in range(state.size):
-                if state.board[i][j] == 'P':
-                    adjacent_count = 0
-                    for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)]:
-                        ni, nj = i + di, j + dj
-                        if 0 <= ni < state.size and 0 <= nj < state.size and state.board[ni][nj] == 'P':
-                            adjacent_count += 1
-                    connectivity += adjacent_count
-        return connectivity
+        # Measure how connected Passer's pieces are: Passer neighbours of Passer cells, per direction
+        return state.passer_links
 
     def calculate_blockage(self, state):
         # Calculate how effectively Eater is blocking potential paths
-        blockage = 0
         middle_start = state.size // 3
         middle_end = 2 * state.size // 3
-
-        for i in range(middle_start, middle_end + 1):
-            eater_count = sum(1 for j in range(state.size) if state.board[i][j] == 'E')
-            blockage += eater_count * 5
+        blockage = sum(state.row_eaters[middle_start:middle_end + 1]) * 5
 
         # Extra points for blocking the middle column
-        middle_col = state.size // 2
-        middle_blockage = sum(5 for i in range(state.size) if state.board[i][middle_col] == 'E')
-        blockage += middle_blockage
+        blockage += state.col_eaters[state.size // 2] * 5
 
         return blockage
 
 
-def cpu_move(game, difficulty="medium"):
+# Pool side of search_root_parallel: one player per worker process, its table and ordering kept
+# across the root moves of an iteration
+_worker = None
+
+
+def _init_worker(shared_alpha, table_size, ordering, pvs, symmetry):
+    global _worker
+    _worker = MiniMaxPlayer(table_size=table_size, ordering=ordering, pvs=pvs, symmetry=symmetry)
+    _worker.shared_alpha = shared_alpha
+    _worker.search_id = None
+
+
+def _search_root_move(state, move, depth, search_id, seconds_left):
+    # Returns (score, alpha it was searched with, nodes), or None if the deadline passed
+    player = _worker
+    if player.search_id != search_id:
+        player.search_id = search_id
+        if player.ordering is not None:
+            player.ordering.new_search()
+    if player.search_depth != depth:  # A new iteration, as in get_move
+        player.search_depth = depth
+        if player.table is not None:
+            player.table.new_search()
+    player.nodes = 0
+    player.deadline = None if seconds_left is None else time.perf_counter() + seconds_left
+    alpha = player.shared_alpha.value
+    try:
+        score = player.search_move(state, move, alpha, float('inf'))
+    except SearchTimeout:
+        return None
+    with player.shared_alpha.get_lock():
+        if score > player.shared_alpha.value:
+            player.shared_alpha.value = score
+    return score, alpha, player.nodes
+
+
+def cpu_move(game, difficulty="medium", time_budget=2.0, solve_below=SOLVE_BELOW):
     print(f"Eater is thinking in {difficulty} mode...")
-    legal_moves = game.get_legal_moves()
 
     # Check for immediate win first
-    for move in legal_moves:
-        game_copy = game.copy()
-        game_copy.make_move(move, 'E')
-        if game_copy.check_eater_win():
-            print("Eater found a winning move!")
-            return move
-
-    minimax_depth = 3
-    minimax_player = MiniMaxPlayer(max_depth=minimax_depth)
+    winning_moves = game.eater_winning_moves()
+    if winning_moves:
+        print("Eater found a winning move!")
+        return winning_moves[0]
+
+    # Opening positions were searched offline
+    move = book_move(game)
+    if move is not None:
+        print("Eater plays from its opening book.")
+        return move
+
+    # Late in the game, try to solve it outright
+    started = time.perf_counter()
+    solver = solve_endgame(game, solve_below, time_budget=time_budget)
+    if solver is not None:
+        if solver.winner == 'E':
+            print(f"Eater has solved the endgame (proof of {solver.proof_size} positions, {solver.nodes} nodes).")
+            return solver.best_move
+        print(f"The Passer wins with best play (proof of {solver.proof_size} positions); searching anyway.")
+    if time_budget is not None:  # The search only gets what the proof attempt left of the budget
+        time_budget = max(time_budget - (time.perf_counter() - started), 0)
+
+    # Deepen until the time budget runs out rather than stopping at a fixed depth; without a budget,
+    # search to the fixed depth used before iterative deepening
+    minimax_player = MiniMaxPlayer(max_depth=None if time_budget is not None else 3, time_budget=time_budget)
     move = minimax_player.get_move(game)
+    print(f"Searched depth {minimax_player.depth_reached} ({minimax_player.nodes} nodes).")
 
     print("Eater has chosen its move.")
     return move
 
 
-def play_game(size, difficulty="medium"):
-    game = GameState(size)
+def play_game(size, difficulty="medium", backend="list"):
+    game = new_state(size, backend)
     print("Welcome to the Eater game! You are the Passer (P). Connect the top to the bottom with your markers.")
     print(
         f"The CPU is the Eater (E) in {difficulty} mode using Minimax. It wins by making it impossible for you to connect.")
@@ -354,7 +609,7 @@ def play_game(size, difficulty="medium"):
                         return
                     row, col = map(int, user_input.split())
                     move = (row - 1, col - 1)
-                    if move in game.get_legal_moves():
+                    if game.is_legal(move):
                         break
                     else:
                         print("Invalid move! Cell must be empty. Try again.")
@@ -0,0 +1,204 @@
+# Max-flow / min-vertex-cut over the open (non-'E') cells, from the top row to the bottom row under
+# the Passer's move rule. Every open cell has capacity one, so the flow is a packing of cell-disjoint
+# top-to-bottom routes and its value is the fewest cells the Eater still has to take to block the
+# Passer. A cell's rank says what taking it does to that number: 2 when it lies on some minimum cut
+# (the count drops by one), 1 when it carries a route that can detour around it, 0 otherwise.
+#
+# The packing is kept between queries and synced by diffing open masks: routes through cells the
+# Eater has taken since are dropped and the rest stay, so a move usually costs one or two augmenting
+# searches rather than a new max-flow. Passer markers don't change the open cells, and cells that
+# reopen on a take-back only add capacity, so any state the structure is synced to -- the same
+# position after unmake_move, or a copy -- is repaired the same way.
+#
+# Cell k is split into k_in (node 2k) and k_out (node 2k + 1) joined by the unit-capacity edge; the
+# edges between cells and to the source and sink are unbounded.
+
+from connectivity import get_geometry, iter_cells
+
+SOURCE = -1
+SINK = -2
+
+
+class MinCut:
+    __slots__ = ('size', 'geometry', 'open_cells', 'into', 'out', 'flow', 'scores')
+
+    def __init__(self, size):
+        self.size = size
+        self.geometry = get_geometry(size)
+        self.open_cells = 0  # Mask the packing was last synced to (no cells: no routes)
+        self.into = [None] * self.geometry.cells  # Per cell on a route: the cell before it, or SOURCE
+        self.out = [None] * self.geometry.cells  # Per cell on a route: the cell after it, or SINK
+        self.flow = 0  # Routes in the packing, i.e. the size of a minimum cut
+        self.scores = None  # Ranking for open_cells, built on the first query after a sync
+
+    def sync(self, open_cells):
+        if open_cells == self.open_cells:
+            return
+        for i, j in iter_cells(self.open_cells & ~open_cells, self.geometry):
+            if self.into[i * self.size + j] is not None:
+                self.drop_route(i * self.size + j)
+        self.open_cells = open_cells
+        self.scores = None
+        while self.augment():
+            pass
+
+    def drop_route(self, k):
+        # Removes the whole route through cell k from the packing
+        into, out = self.into, self.out
+        cell = k
+        while cell != SINK:
+            following = out[cell]
+            out[cell] = None
+            if following != SINK:
+                into[following] = None
+            cell = following
+        cell = k
+        while cell != SOURCE:
+            preceding = into[cell]
+            into[cell] = None
+            if preceding != SOURCE:
+                out[preceding] = None
+            cell = preceding
+        self.flow -= 1
+
+    def augment(self):
+        # One breadth-first search for an augmenting path in the residual graph; True if it found
+        # one and added the route
+        size, open_cells, into, out = self.size, self.open_cells, self.into, self.out
+        successors = self.geometry.successors
+        last_row = self.geometry.cells - size
+        parent = {}
+        queue = []
+        for k in range(size):
+            if open_cells >> k & 1 and into[k] != SOURCE:
+                parent[2 * k] = None
+                queue.append(2 * k)
+        for node in queue:  # Grows while it is walked, so this is the BFS queue
+            k = node >> 1
+            if node & 1:  # k_out: on to any open successor, the sink, or back through a used cell
+                if k >= last_row:
+                    self.apply(parent, node)
+                    return True
+                steps = [2 * w for w in successors[k] if open_cells >> w & 1]
+                if out[k] is not None:
+                    steps.append(node - 1)
+            elif out[k] is None:  # Unused k_in: through the cell
+                steps = (node + 1,)
+            elif into[k] != SOURCE:  # Used k_in: back along the route that enters it
+                steps = (2 * into[k] + 1,)
+            else:
+                steps = ()
+            for step in steps:
+                if step not in parent:
+                    parent[step] = node
+                    queue.append(step)
+        return False
+
+    def apply(self, parent, node):
+        # Pushes one unit along the path the BFS reached the sink by (node is the last k_out)
+        into, out = self.into, self.out
+        path = [node]
+        while parent[node] is not None:
+            node = parent[node]
+            path.append(node)
+        path.reverse()
+        removed, added = [], [(SOURCE, path[0] >> 1)]
+        for a, b in zip(path, path[1:]):
+            ka, kb = a >> 1, b >> 1
+            if ka == kb:  # Through a cell, or back through it; nothing stored per cell
+                continue
+            if not a & 1 or out[kb] == ka:  # Back along kb -> ka, or forward against it: cancels that step
+                removed.append((kb, ka))
+            else:
+                added.append((ka, kb))
+        added.append((path[-1] >> 1, SINK))
+        for a, b in removed:
+            out[a] = None
+            into[b] = None
+        for a, b in added:
+            if a != SOURCE:
+                out[a] = b
+            if b != SINK:
+                into[b] = a
+        self.flow += 1
+
+    def residual(self, node):
+        # Residual edges out of a node; the source is node 2 * cells and the sink node 2 * cells + 1
+        size, open_cells, into, out = self.size, self.open_cells, self.into, self.out
+        cells = self.geometry.cells
+        if node == 2 * cells:
+            return [2 * k for k in range(size) if open_cells >> k & 1 and into[k] != SOURCE]
+        if node == 2 * cells + 1:
+            return [2 * k + 1 for k in range(cells - size, cells) if out[k] == SINK]
+        k = node >> 1
+        if node & 1:
+            steps = [2 * w for w in self.geometry.successors[k] if open_cells >> w & 1]
+            if k >= cells - size:
+                steps.append(2 * cells + 1)
+            if out[k] is not None:
+                steps.append(node - 1)
+            return steps
+        if out[k] is None:
+            return [node + 1]
+        return [2 * cells if into[k] == SOURCE else 2 * into[k] + 1]
+
+    def components(self):
+        # Strongly connected component of every residual node (iterative Tarjan), as a list indexed
+        # by node with None for cells that aren't open
+        cells = self.geometry.cells
+        nodes = [2 * cells, 2 * cells + 1]
+        for i, j in iter_cells(self.open_cells, self.geometry):
+            nodes += (2 * (i * self.size + j), 2 * (i * self.size + j) + 1)
+        index = [None] * (2 * cells + 2)
+        low = [0] * (2 * cells + 2)
+        component = [None] * (2 * cells + 2)
+        on_stack = [False] * (2 * cells + 2)
+        stack = []
+        counter = 0
+        for root in nodes:
+            if index[root] is not None:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, iter(self.residual(root)))]
+            while work:
+                node, steps = work[-1]
+                for step in steps:
+                    if index[step] is None:
+                        index[step] = low[step] = counter
+                        counter += 1
+                        stack.append(step)
+                        on_stack[step] = True
+                        work.append((step, iter(self.residual(step))))
+                        break
+                    if on_stack[step] and index[step] < low[node]:
+                        low[node] = index[step]
+                else:
+                    work.pop()
+                    if work and low[node] < low[work[-1][0]]:
+                        low[work[-1][0]] = low[node]
+                    if low[node] == index[node]:
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = False
+                            component[member] = node
+                            if member == node:
+                                break
+        return component
+
+    def ranking(self, open_cells):
+        # Rank of every cell, indexed i * size + j, for the position whose open cells are given. A
+        # used cell is on some minimum cut exactly when its own edge is saturated and the residual
+        # graph can't get from k_in to k_out, i.e. they sit in different components.
+        self.sync(open_cells)
+        if self.scores is None:
+            scores = [0] * self.geometry.cells
+            if self.flow:
+                component = self.components()
+                for k in range(self.geometry.cells):
+                    if self.out[k] is not None:
+                        scores[k] = 2 if component[2 * k] != component[2 * k + 1] else 1
+            self.scores = tuple(scores)
+        return self.scores
@@ -0,0 +1,181 @@
+# Depth-first proof-number search (df-pn) for the endgame. Every move either fills an empty cell or
+# turns a Passer cell into an Eater one, so the game is a finite DAG that always ends with a winner,
+# and a position's outcome only depends on its cells, the side to move and eater_turn_count % 3 --
+# exactly what the canonical Zobrist key covers, so the table can share results across move orders
+# and mirror images. Legal moves come from the state, which already applies the overwrite rule.
+# The search runs on a bitboard copy of the position, whatever backend the caller uses.
+
+import time
+
+from bitboard import BitboardGameState
+
+INFINITY = 10 ** 9
+SOLVE_BELOW = 16  # Empty cells below which cpu_move tries to solve the game outright
+SOLVE_SHARE = 0.5  # Share of a move's time budget the endgame proof may use; the search gets the rest
+SOLVE_TIME = 0.5  # Proof time limit for a move without a time budget, about what such a hard-mode search takes
+
+
+class SolverLimit(Exception):
+    # Raised inside the search when the node or time limit runs out
+    pass
+
+
+class ProofNumberSolver:
+    # Proves or disproves "the Eater wins". Proof and disproof numbers are kept per canonical key:
+    # (0, INFINITY) is an Eater win, (INFINITY, 0) a Passer win. After solve(), winner is 'E', 'P' or
+    # None (limits reached), best_move the winning move when the winner is to move, and proof_size
+    # the number of distinct positions in the proof (or disproof) tree.
+    def __init__(self, max_nodes=300000, time_limit=5.0):
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit  # Seconds, or None for no limit
+        self.table = {}
+        self.children = {}  # Zobrist key -> (legal moves, child keys), as mid() revisits positions often
+        self.nodes = 0  # Expanded positions in the last solve()
+        self.winner = None
+        self.best_move = None
+        self.proof_size = 0
+        self.deadline = None
+
+    def solve(self, state):
+        state = BitboardGameState.from_state(state)  # Cheapest make/unmake and win checks of the backends
+        self.table = {}
+        self.children = {}
+        self.nodes = 0
+        self.winner = None
+        self.best_move = None
+        self.proof_size = 0
+        self.deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        if self.terminal(state) is None:
+            try:
+                self.mid(state, INFINITY, INFINITY)
+            except SolverLimit:
+                return None
+        proof, _ = self.numbers(state)
+        self.winner = 'E' if proof == 0 else 'P'
+        self.best_move = self.winning_move(state)
+        self.proof_size = self.count_proof(state, set())
+        return self.winner
+
+    def terminal(self, state):
+        # Numbers of a finished game, or None while it goes on
+        if state.check_eater_win():
+            return 0, INFINITY
+        if state.check_passer_win():
+            return INFINITY, 0
+        return None
+
+    def numbers(self, state):
+        return self.table.get(state.canonical_key()[0]) or self.terminal(state) or (1, 1)
+
+    def child_keys(self, state, moves):
+        # Canonical key of the position after each move; finished games go straight into the table
+        mover = state.current_player
+        keys = []
+        for move in moves:
+            state.make_move(move, mover)
+            state.current_player = 'P' if mover == 'E' else 'E'
+            key = state.canonical_key()[0]
+            if key not in self.table:
+                result = self.terminal(state)
+                if result is not None:
+                    self.table[key] = result
+            keys.append(key)
+            state.unmake_move()
+        return keys
+
+    def mid(self, state, proof_limit, disproof_limit):
+        # Searches below `state` until its proof number reaches proof_limit or its disproof number
+        # reaches disproof_limit, then stores and returns both
+        self.nodes += 1
+        if self.nodes > self.max_nodes or (self.deadline is not None and not self.nodes & 255
+                                           and time.perf_counter() >= self.deadline):
+            raise SolverLimit
+        key = state.canonical_key()[0]
+        mover = state.current_player
+        eater_to_move = mover == 'E'  # OR node: one proved child proves it
+        expansion = self.children.get(state.zobrist_key())
+        if expansion is None:
+            moves = state.legal_moves_view()
+            expansion = self.children[state.zobrist_key()] = (moves, self.child_keys(state, moves))
+        moves, keys = expansion
+        table = self.table
+
+        while True:
+            children = [table.get(child, (1, 1)) for child in keys]
+            if eater_to_move:
+                proof = min(p for p, _ in children)
+                disproof = min(INFINITY, sum(d for _, d in children))
+            else:
+                proof = min(INFINITY, sum(p for p, _ in children))
+                disproof = min(d for _, d in children)
+            if proof >= proof_limit or disproof >= disproof_limit:
+                break
+
+            # Most-proving child, and how far it may go before its sibling becomes the better bet
+            side = 0 if eater_to_move else 1
+            best = min(range(len(children)), key=lambda k: children[k][side])
+            second = min((children[k][side] for k in range(len(children)) if k != best), default=INFINITY)
+            child_proof, child_disproof = children[best]
+            if eater_to_move:
+                limits = (min(proof_limit, second + 1), disproof_limit - disproof + child_disproof)
+            else:
+                limits = (proof_limit - proof + child_proof, min(disproof_limit, second + 1))
+            state.make_move(moves[best], mover)
+            state.current_player = 'P' if eater_to_move else 'E'
+            self.mid(state, *limits)
+            state.unmake_move()
+
+        table[key] = (proof, disproof)
+        return proof, disproof
+
+    def solved_for_winner(self, state):
+        proof, disproof = self.numbers(state)
+        return proof == 0 if self.winner == 'E' else disproof == 0
+
+    def winning_move(self, state):
+        # First move that keeps the win, when the winner is the side to move
+        mover = state.current_player
+        if mover != self.winner or self.terminal(state) is not None:
+            return None
+        for move in state.legal_moves_view():
+            state.make_move(move, mover)
+            state.current_player = 'P' if mover == 'E' else 'E'
+            solved = self.solved_for_winner(state)
+            state.unmake_move()
+            if solved:
+                return move
+        return None
+
+    def count_proof(self, state, seen):
+        # Distinct positions in the proof: one winning move where the winner moves, every reply
+        # where the loser does
+        key = state.canonical_key()[0]
+        if key in seen:
+            return 0
+        seen.add(key)
+        if self.terminal(state) is not None:
+            return 1
+        mover = state.current_player
+        size = 1
+        replies = [self.winning_move(state)] if mover == self.winner else state.legal_moves_view()
+        for move in replies:
+            state.make_move(move, mover)
+            state.current_player = 'P' if mover == 'E' else 'E'
+            size += self.count_proof(state, seen)
+            state.unmake_move()
+        return size
+
+
+def empty_cells(state):
+    return sum(row.count(None) for row in state.board)
+
+
+def solve_endgame(state, empty_below=SOLVE_BELOW, max_nodes=300000, time_budget=None):
+    # The solver after solving `state`, or None when the position isn't late enough or the limits ran
+    # out. time_budget is the caller's for the whole move, of which the proof takes SOLVE_SHARE
+    if empty_cells(state) >= empty_below:
+        return None
+    solver = ProofNumberSolver(max_nodes, SOLVE_TIME if time_budget is None else time_budget * SOLVE_SHARE)
+    if solver.solve(state) is None:
+        return None
+    return solver
@@ -0,0 +1,268 @@
+# Game rules shared by every engine: the list-of-lists GameState with its incremental win checks,
+# plus the registry of interchangeable storage backends. Engines import their state from here.
+
+from bitboard import BitboardGameState
+from connectivity import (NEIGHBOURS, PasserUnionFind, OpenReachability, PasserChain, get_geometry, cells_tuple,
+                          cut_cells, threat_cells, double_threat_cells)
+from mincut import MinCut
+from zobrist import get_keys
+
+# A Passer cell's links: Passer cells it can step to plus Passer cells that can step to it. Left and
+# right appear in both halves, matching the evaluation's count of (cell, neighbour) pairs.
+_LINKS = NEIGHBOURS + [(-di, -dj) for di, dj in NEIGHBOURS]
+
+
+class GameState:
+    __slots__ = ('size', 'board', 'current_player', 'eater_turn_count', 'passer_win_cache', 'eater_win_cache',
+                 'last_move', 'passer_last_move', 'passer_sets', 'open_reach', 'row_eaters', 'passer_chain',
+                 'undo_stack', 'keys', 'cell_hash', 'geometry', 'empty_mask', 'open_mask', 'moves_mask', 'moves_view',
+                 'col_eaters', 'passer_links', 'mirror_hash', 'min_cut', 'threat_cache')
+
+    def __init__(self, size):
+        self.size = size
+        self.board = [[None for _ in range(size)] for _ in range(size)]  # None: empty, 'P': Passer, 'E': Eater
+        self.current_player = 'P'  # Passer starts
+        self.eater_turn_count = 0  # Track Eater's turns for overwrite restriction
+        self.passer_win_cache = None  # Cache for Passer win condition
+        self.eater_win_cache = None  # Cache for Eater win condition
+        self.threat_cache = None  # (Passer threats, double threats or None) for this position
+        self.last_move = None  # Track last move to invalidate cache
+        self.passer_last_move = None  # Track Passer's last move
+        self.passer_sets = PasserUnionFind(size)  # Incremental Passer connectivity, rules out a win in O(1)
+        self.open_reach = OpenReachability(size)  # Non-'E' cells reachable from the top row
+        self.row_eaters = [0] * size  # Eater markers per row, a full row wins for the Eater
+        self.col_eaters = [0] * size  # Eater markers per column
+        self.passer_links = 0  # Passer cells with a Passer neighbour under the move rule, counted per direction
+        self.passer_chain = PasserChain(size)  # Row-by-row DP behind find_passer_path
+        self.undo_stack = []  # One record per make_move, popped by unmake_move
+        self.keys = get_keys(size)
+        self.cell_hash = 0  # Zobrist hash of the cells, kept up to date by make_move
+        self.mirror_hash = 0  # The same hash of the board with its columns reversed
+        self.geometry = get_geometry(size)
+        self.empty_mask = self.geometry.full  # Bit i * size + j is set while cell (i, j) is empty
+        self.open_mask = self.geometry.full  # Cells without an 'E', the targets on overwrite turns
+        self.moves_mask = None  # Mask the cached moves_view was built from
+        self.moves_view = ()
+        self.min_cut = None  # Route packing behind cut_ranking, made on first use
+
+    @property
+    def passer_mask(self): #Cells holding 'P', under the same name as on the bitboard backend.
+        return self.open_mask & ~self.empty_mask
+
+    def overwrite_turn(self):
+        return self.current_player == 'E' and self.eater_turn_count % 3 == 2  # Overwrite allowed every 3 turns (turns 3, 6, 9, ...)
+
+    def legal_moves_view(self): #Immutable tuple of legal moves, rebuilt only when the relevant mask has changed. Overwrite turns skip cells that are already 'E'.
+        mask = self.open_mask if self.overwrite_turn() else self.empty_mask  # Other turns: must place in empty cell
+        if mask != self.moves_mask:
+            self.moves_mask = mask
+            self.moves_view = cells_tuple(mask, self.geometry)
+        return self.moves_view
+
+    def get_legal_moves(self):
+        return list(self.legal_moves_view())
+
+    def is_legal(self, move): #O(1) membership test against the maintained masks instead of scanning a move list.
+        i, j = move
+        if not (0 <= i < self.size and 0 <= j < self.size):
+            return False
+        mask = self.open_mask if self.overwrite_turn() else self.empty_mask
+        return bool(mask >> (i * self.size + j) & 1)
+
+    def eater_winning_moves(self): #Cells where the Eater's next marker wins, in row-major order, from one cut-cell pass.
+        wins = cut_cells(self.open_mask, self.geometry)
+        for i, count in enumerate(self.row_eaters):
+            if count == self.size - 1:
+                wins |= self.geometry.row_masks[i]
+        legal = self.open_mask if self.eater_turn_count % 3 == 2 else self.empty_mask
+        return cells_tuple(wins & legal, self.geometry)
+
+    def passer_threats(self): #Empty cells where a Passer marker completes a top-to-bottom path, in row-major order. Cached until the next move.
+        if self.threat_cache is None:
+            passer = self.open_mask & ~self.empty_mask
+            self.threat_cache = (cells_tuple(threat_cells(passer, self.empty_mask, self.geometry), self.geometry), None)
+        return self.threat_cache[0]
+
+    def passer_double_threats(self): #Empty non-winning cells after which the Passer has two or more threats.
+        threats = self.passer_threats()
+        if self.threat_cache[1] is None:
+            passer = self.open_mask & ~self.empty_mask
+            doubles = double_threat_cells(passer, self.empty_mask, self.geometry)
+            self.threat_cache = (threats, cells_tuple(doubles, self.geometry))
+        return self.threat_cache[1]
+
+    def cut_ranking(self): #Per cell i * size + j: 2 on a minimum cut of the open routes, 1 on a route that can detour, 0 otherwise (see mincut).
+        if self.min_cut is None:
+            self.min_cut = MinCut(self.size)
+        return self.min_cut.ranking(self.open_mask)
+
+    def make_move(self, move, player):
+        i, j = move
+        self.undo_stack.append((move, self.board[i][j], self.current_player, self.eater_turn_count, self.last_move,
+                                self.passer_last_move, self.passer_win_cache, self.eater_win_cache, self.threat_cache,
+                                self.passer_sets.mark(), self.open_reach.mark(), self.cell_hash, self.passer_links,
+                                self.mirror_hash))
+        self.last_move = (move, player)  # Invalidate cache on move
+        self.passer_win_cache = None
+        self.eater_win_cache = None
+        self.threat_cache = None
+        if player == 'E':
+            overwrite = self.board[i][j] == 'P'
+            if overwrite:
+                self.cell_hash ^= self.keys.passer[i * self.size + j]
+                self.mirror_hash ^= self.keys.passer[i * self.size + self.size - 1 - j]
+                self.passer_links -= self.links(i, j)
+            if self.board[i][j] != 'E':
+                bit = 1 << (i * self.size + j)
+                self.empty_mask &= ~bit
+                self.open_mask &= ~bit
+                self.row_eaters[i] += 1
+                self.col_eaters[j] += 1
+                self.open_reach.block(i, j)
+                self.cell_hash ^= self.keys.eater[i * self.size + j]
+                self.mirror_hash ^= self.keys.eater[i * self.size + self.size - 1 - j]
+            self.board[i][j] = 'E'
+            if overwrite:  # Only possible on overwrite turns; union-find can't split, so rebuild it
+                self.passer_sets.rebuild(self.board)
+                self.passer_chain.touch(i)
+            self.eater_turn_count += 1
+        elif player == 'P' and self.board[i][j] is None:
+            self.board[i][j] = 'P'
+            self.passer_links += self.links(i, j)
+            self.empty_mask &= ~(1 << (i * self.size + j))
+            self.passer_sets.add(i, j, self.board)
+            self.passer_chain.touch(i)
+            self.cell_hash ^= self.keys.passer[i * self.size + j]
+            self.mirror_hash ^= self.keys.passer[i * self.size + self.size - 1 - j]
+            self.passer_last_move = (i, j)  # Update Passer's last move
+
+    def unmake_move(self): #Takes back the last make_move exactly, including overwritten 'P' cells, so searches can walk the tree without copying.
+        (move, cell, self.current_player, self.eater_turn_count, self.last_move, self.passer_last_move,
+         self.passer_win_cache, self.eater_win_cache, self.threat_cache, sets_mark, reach_mark, self.cell_hash,
+         self.passer_links, self.mirror_hash) = self.undo_stack.pop()
+        i, j = move
+        if self.board[i][j] == 'E' and cell != 'E':
+            self.row_eaters[i] -= 1
+            self.col_eaters[j] -= 1
+        if cell == 'P' or self.board[i][j] == 'P':
+            self.passer_chain.touch(i)
+        if cell is None:
+            bit = 1 << (i * self.size + j)
+            self.empty_mask |= bit
+            self.open_mask |= bit
+        elif cell == 'P' and self.board[i][j] == 'E':
+            self.open_mask |= 1 << (i * self.size + j)
+        self.board[i][j] = cell
+        self.passer_sets.rollback(sets_mark)
+        self.open_reach.rollback(reach_mark)
+
+    def links(self, i, j):
+        # Twice the Passer neighbours left and right, once those above and below
+        board, size = self.board, self.size
+        count = 0
+        for di, dj in _LINKS:
+            ni, nj = i + di, j + dj
+            if 0 <= ni < size and 0 <= nj < size and board[ni][nj] == 'P':
+                count += 1
+        return count
+
+    def check_passer_win(self):
+        if self.passer_win_cache is not None:
+            return self.passer_win_cache
+        if not self.passer_sets.spans():  # Top and bottom aren't even loosely connected
+            self.passer_win_cache = False
+            return False
+
+        visited = set()
+        def dfs(i, j):
+            if (i, j) in visited or i < 0 or i >= self.size or j < 0 or j >= self.size or self.board[i][j] != 'P':
+                return False
+            if i == self.size - 1:  # Reached bottom row with a 'P'
+                return True
+            visited.add((i, j))
+            return any(dfs(i + di, j + dj) for di, dj in [(1, 0), (0, -1), (0, 1), (1, -1), (1, 1)])
+
+        passer_wins = any(dfs(0, j) for j in range(self.size) if self.board[0][j] == 'P')
+        self.passer_win_cache = passer_wins
+        return self.passer_win_cache
+
+    def check_eater_win(self):
+        if self.eater_win_cache is not None:
+            return self.eater_win_cache
+
+        if self.size in self.row_eaters: #checks if eater has occupied an entire row
+            self.eater_win_cache = True
+            return True
+
+        # The Eater wins if no 'P'/empty path from the top row reaches the bottom row any more
+        self.eater_win_cache = self.open_reach.blocked()
+        return self.eater_win_cache
+
+    def find_passer_path(self): #finds the deepest chain the passer has made from the top row (used by the eater to prioritize blocking moves & used in the MCTS sim). Only rows at or below the last changed Passer cell are recomputed.
+        return self.passer_chain.path(self.board)
+
+    def display(self):
+        print('   ', ' '.join(str(i + 1) for i in range(self.size)))
+        for i in range(self.size):
+            row = [self.board[i][j] if self.board[i][j] else '|' for j in range(self.size)]
+            print(f'{i + 1:2} ', ' '.join(row))
+
+    def zobrist_key(self): #Position key for transposition tables: cells, side to move and where we are in the overwrite cycle.
+        return self.cell_hash ^ self.keys.side[self.current_player] ^ self.keys.turn[self.eater_turn_count % 3]
+
+    def canonical_key(self): #The rules are symmetric under reversing the columns, so a position and its mirror image share this key. Returns (key, mirrored), mirrored telling whether the key is the mirror image's.
+        turn = self.keys.side[self.current_player] ^ self.keys.turn[self.eater_turn_count % 3]
+        if self.mirror_hash < self.cell_hash:
+            return self.mirror_hash ^ turn, True
+        return self.cell_hash ^ turn, False
+
+    def is_mirror_symmetric(self): #The board reads the same with its columns reversed (equal hashes), so (i, j) and its mirror move lead to mirror-image positions.
+        return self.cell_hash == self.mirror_hash
+
+
+    def get_passer_last_move(self):
+        return self.passer_last_move
+
+    def copy(self): #Creates deep copy of the curr game state. Used in MCTS to simulate moves without modifying the actual game state.
+        new_state = GameState(self.size)
+        new_state.board = [row[:] for row in self.board]
+        new_state.current_player = self.current_player
+        new_state.eater_turn_count = self.eater_turn_count
+        new_state.passer_win_cache = self.passer_win_cache
+        new_state.eater_win_cache = self.eater_win_cache
+        new_state.threat_cache = self.threat_cache
+        new_state.last_move = self.last_move
+        new_state.passer_last_move = self.passer_last_move
+        new_state.passer_sets = self.passer_sets.copy()
+        new_state.open_reach = self.open_reach.copy()
+        new_state.row_eaters = self.row_eaters[:]
+        new_state.col_eaters = self.col_eaters[:]
+        new_state.passer_links = self.passer_links
+        new_state.cell_hash = self.cell_hash
+        new_state.mirror_hash = self.mirror_hash
+        new_state.passer_chain = self.passer_chain.copy()
+        new_state.empty_mask = self.empty_mask
+        new_state.open_mask = self.open_mask
+        new_state.moves_mask = self.moves_mask  # The cached tuple is immutable, so copies can share it
+        new_state.moves_view = self.moves_view
+        new_state.min_cut = self.min_cut  # Syncs to whichever state asks, so copies can share it
+        return new_state
+
+BACKENDS = {'list': GameState, 'bitboard': BitboardGameState}  # Interchangeable board representations
+
+
+def new_state(size, backend="list"):
+    return BACKENDS[backend](size)
+
+
+def mirror_move(move, size):
+    return move[0], size - 1 - move[1]
+
+
+def drop_mirror_moves(moves, size):
+    # At a mirror-symmetric position: the first move of every mirror pair, in the given order
+    kept = set()
+    for i, j in moves:
+        if (i, size - 1 - j) not in kept:
+            kept.add((i, j))
+    return [move for move in moves if move in kept]
@@ -0,0 +1,224 @@
+# Tree-parallel MCTS: worker processes grow one tree kept in flat arrays in a
+# multiprocessing.shared_memory block, instead of one tree each (MCTS(workers=N)). Node k is slot k of
+# every array and a node's children take consecutive slots, so the tree is a handful of typed views
+# and a node is an index. Each worker replays the selected path on its own copy of the root state and
+# runs the same rollouts as hard.MCTS.
+#
+# Virtual loss: every node on a path being searched counts one extra visit that lost until its
+# backpropagation lands, so concurrent selections see a worse value there and fan out across
+# siblings. Counter updates take one of a set of striped locks (node k uses lock k % len(locks)), so
+# workers only contend when they touch nodes in the same stripe; reads for selection take no lock.
+# Claiming a leaf for expansion and allocating child slots are the only other locked steps.
+
+import math
+import multiprocessing
+import random
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from hard import MCTS, MCTSNode
+from rules import drop_mirror_moves
+
+# Node status
+LEAF = 0  # Not expanded yet
+CLAIMED = 1  # A worker is expanding it; others treat it as a leaf meanwhile
+EXPANDED = 2  # Children written (none for a finished game)
+FULL = 3  # No room left for its children: only ever simulated from
+
+# Per-node arrays: (name, typecode); doubles first so every view stays 8-byte aligned
+FIELDS = (('visits', 'd'), ('wins', 'd'), ('virtual', 'i'), ('first', 'i'), ('count', 'i'), ('status', 'i'),
+          ('move', 'i'))
+HEADER = 8  # Bytes before the node arrays: the next free slot, as one int
+STRIPES = 64
+
+
+def block_size(capacity):
+    return HEADER + sum(capacity * (8 if code == 'd' else 4) for _, code in FIELDS)
+
+
+class SharedTree:
+    # Typed views of the tree arrays in one shared memory block
+    def __init__(self, buf, capacity):
+        self.capacity = capacity
+        self.free = buf[:HEADER].cast('i')  # free[0]: next unused slot
+        offset = HEADER
+        for name, code in FIELDS:
+            width = 8 if code == 'd' else 4
+            setattr(self, name, buf[offset:offset + capacity * width].cast(code))
+            offset += capacity * width
+
+    def release(self):
+        # Views must go before the block can be closed
+        for name, _ in FIELDS:
+            getattr(self, name).release()
+        self.free.release()
+
+
+class TreeParallelMCTS:
+    # Same limits as hard.MCTS: iterations caps the root's visits over all workers, time_budget the
+    # wall clock, either may be None but not both. capacity bounds the nodes; once it is used up,
+    # leaves stop expanding and are only simulated from. search returns None when the root has no
+    # children.
+    def __init__(self, iterations=1000, max_depth=8, time_budget=None, workers=2, capacity=200000):
+        if iterations is None and time_budget is None:
+            raise ValueError("MCTS needs an iteration cap, a time budget or both")
+        self.iterations = iterations
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self.workers = workers
+        self.capacity = capacity
+        self.pool = None  # Started by the first search, see close()
+        self.locks = None
+        self.root_visits = {}  # Move -> visits of the root's children in the last search
+        self.nodes = 0  # Slots the last search used
+        self.iterations_run = 0  # Iterations over all workers in the last search
+
+    def search(self, state, time_budget=None):
+        if time_budget is None:
+            time_budget = self.time_budget
+        if self.pool is None:
+            # Workers attaching to a block register it with the resource tracker; with the tracker
+            # started first they share this process's, instead of starting their own that would
+            # report the block as leaked when they exit
+            resource_tracker.ensure_running()
+            self.locks = [multiprocessing.Lock() for _ in range(STRIPES + 1)]  # The last one guards allocation
+            self.pool = multiprocessing.Pool(self.workers, initializer=_init_worker,
+                                             initargs=(self.locks, self.max_depth))
+        block = shared_memory.SharedMemory(create=True, size=block_size(self.capacity))
+        tree = SharedTree(block.buf, self.capacity)
+        try:
+            tree.free[0] = 1  # Slot 0 is the root, a zeroed leaf
+            root = state.copy()
+            tasks = [(block.name, self.capacity, root, random.randrange(2 ** 32), self.iterations, time_budget)
+                     for _ in range(self.workers)]
+            self.iterations_run = sum(self.pool.starmap(_grow_shared, tasks))
+            self.nodes = min(tree.free[0], self.capacity)
+            first, count = tree.first[0], tree.count[0]
+            coords = state.geometry.coords
+            self.root_visits = {coords[tree.move[k]]: tree.visits[k] for k in range(first, first + count)}
+        finally:
+            tree.release()  # Views must go before the block can be closed, also when a worker failed
+            block.close()
+            block.unlink()
+        if not self.root_visits:  # A finished game, or no room for the root's children
+            return None
+        return max(self.root_visits, key=self.root_visits.get)
+
+    def close(self):
+        # Shuts down the worker pool
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+
+# Worker side: the striped locks and a plain MCTS for its rollouts
+_locks = None
+_rollouts = None
+
+
+def _init_worker(locks, max_depth):
+    global _locks, _rollouts
+    _locks = locks
+    _rollouts = MCTS(max_depth=max_depth)
+
+
+def _grow_shared(name, capacity, state, seed, iterations, time_budget):
+    # Runs iterations on the shared tree until the root has `iterations` visits or the time is up;
+    # returns how many this worker ran
+    block = shared_memory.SharedMemory(name=name)
+    tree = SharedTree(block.buf, capacity)
+    random.seed(seed)
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    state = state.copy()
+    made = 0
+    try:
+        while iterations is None or tree.visits[0] < iterations:
+            if deadline is not None and made and time.perf_counter() >= deadline:
+                break
+            _iterate(tree, state)
+            made += 1
+            while state.undo_stack:
+                state.unmake_move()
+    finally:
+        tree.release()
+        block.close()
+    return made
+
+
+def _add(tree, node, visits, wins, virtual):
+    with _locks[node % STRIPES]:
+        tree.visits[node] += visits
+        tree.wins[node] += wins
+        tree.virtual[node] += virtual
+
+
+def _iterate(tree, state):
+    # One selection, expansion, rollout and backpropagation on the shared tree
+    coords = state.geometry.coords
+    node = 0
+    path = [0]
+    _add(tree, 0, 0, 0, 1)
+    while tree.status[node] == EXPANDED and tree.count[node]:
+        node = _best_child(tree, node)
+        path.append(node)
+        _add(tree, node, 0, 0, 1)
+        _rollouts._play(state, coords[tree.move[node]])
+    if tree.status[node] == LEAF and _claim(tree, node):
+        child = _expand(tree, node, state)
+        if child is not None:
+            path.append(child)
+            _add(tree, child, 0, 0, 1)
+            _rollouts._play(state, coords[tree.move[child]])
+    reward = _rollouts._simulate(state)
+    for node in reversed(path):
+        _add(tree, node, 1, reward, -1)
+        reward = -reward
+
+
+def _best_child(tree, node):
+    # UCB1 as in MCTSNode.best_child, counting virtual losses as visits that lost; children nobody
+    # has visited yet go first, in priority order
+    visits, wins, virtual = tree.visits, tree.wins, tree.virtual
+    first = tree.first[node]
+    log_parent = math.log(max(visits[node] + virtual[node], 1))
+    best, best_weight = first, float('-inf')
+    for child in range(first, first + tree.count[node]):
+        seen = visits[child] + virtual[child]
+        if not seen:
+            return child
+        weight = (wins[child] - virtual[child]) / seen + 1.4 * math.sqrt(2 * log_parent / seen)
+        if weight > best_weight:
+            best, best_weight = child, weight
+    return best
+
+
+def _claim(tree, node):
+    with _locks[node % STRIPES]:
+        if tree.status[node] != LEAF:
+            return False
+        tree.status[node] = CLAIMED
+        return True
+
+
+def _expand(tree, node, state):
+    # Writes the node's children (the same priority moves hard.MCTS expands) and returns the first,
+    # or None for a finished game or a full tree
+    moves = ()
+    leaf = MCTSNode(state)
+    if leaf.moves is None:
+        moves = leaf.get_priority_moves(state)
+        if state.is_mirror_symmetric():
+            moves = drop_mirror_moves(moves, state.size)
+    with _locks[STRIPES]:
+        first = tree.free[0]
+        if first + len(moves) > tree.capacity:
+            tree.status[node] = FULL
+            return None
+        tree.free[0] = first + len(moves)
+    for offset, (i, j) in enumerate(moves):
+        tree.move[first + offset] = i * state.size + j
+    with _locks[node % STRIPES]:  # Children written first; first/count/status go out together, as in _claim
+        tree.first[node] = first
+        tree.count[node] = len(moves)
+        tree.status[node] = EXPANDED
+    return first if moves else None
@@ -0,0 +1,36 @@
+import random
+
+# Zobrist keys for GameState hashing. Keys come from a generator seeded with the board size, so a
+# position hashes to the same value in every process and every run.
+
+_KEYS = {}
+
+
+class ZobristKeys:
+    def __init__(self, size):
+        rng = random.Random(size)
+        cells = size * size
+        self.passer = [rng.getrandbits(64) for _ in range(cells)]
+        self.eater = [rng.getrandbits(64) for _ in range(cells)]
+        self.side = {'P': 0, 'E': rng.getrandbits(64)}  # Side to move
+        self.turn = [0, rng.getrandbits(64), rng.getrandbits(64)]  # eater_turn_count % 3
+
+
+def get_keys(size):
+    keys = _KEYS.get(size)
+    if keys is None:
+        keys = _KEYS[size] = ZobristKeys(size)
+    return keys
+
+
+def board_hash(board, size):
+    # From-scratch hash of the cells, matching what make_move maintains incrementally
+    keys = get_keys(size)
+    value = 0
+    for i in range(size):
+        for j in range(size):
+            if board[i][j] == 'P':
+                value ^= keys.passer[i * size + j]
+            elif board[i][j] == 'E':
+                value ^= keys.eater[i * size + j]
+    return value